@@ -1,4 +1,5 @@
 from langchain_openai import ChatOpenAI
+from helpers.routing_index import RoutingIndex
 
 class ControllerAgent:
     def __init__(self):
@@ -25,19 +26,23 @@ class ControllerAgent:
             "creative", "story", "poem", "write", "creative writing",
             "narrative", "fiction", "artistic", "literature", "essay"
         ]
+        
+        # Both keyword lists compiled into one table of word forms, looked up in one pass per query
+        self.routing_index = RoutingIndex({
+            "gpt-oss:20b": self.gpt_oss_keywords,
+            "mistral": self.mistral_keywords,
+        })
 
     def route_query(self, query):
         """
         Determine which LLM to use based on query content.
         Returns tuple of (model_name, reasoning)
         """
-        query_lower = query.lower()
-        
-        # Check for GPT-OSS keywords (technical/coding)
-        gpt_score = sum(1 for keyword in self.gpt_oss_keywords if keyword in query_lower)
+        scores = self.routing_index.scores(query)
         
-        # Check for Mistral keywords (creative)
-        mistral_score = sum(1 for keyword in self.mistral_keywords if keyword in query_lower)
+        # GPT-OSS keywords (technical/coding) vs Mistral keywords (creative)
+        gpt_score = scores["gpt-oss:20b"]
+        mistral_score = scores["mistral"]
         
         if gpt_score > mistral_score:
             return "gpt-oss:20b", f"Technical query detected (score: {gpt_score} vs {mistral_score})"
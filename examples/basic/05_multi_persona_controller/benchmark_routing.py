@@ -0,0 +1,71 @@
+"""
+Routing throughput benchmark: substring keyword scan vs the compiled RoutingIndex
+
+Scores synthetic queries with both scorers and reports queries per second and
+how often the two disagree (the index only matches whole words and their
+inflections). The substring scan gets slower with every keyword added while
+the index does not, so the benchmark also runs a larger routing table (20 agents x 25 keywords).
+
+Usage:
+    python benchmark_routing.py [number_of_queries]   # default: 1,000,000
+"""
+
+import sys
+import time
+import random
+from main import MultiPersonaController
+from helpers.routing_index import RoutingIndex
+
+FILLER_WORDS = [
+    "how", "do", "i", "the", "a", "about", "for", "my", "with", "please", "explain", "what",
+    "is", "best", "way", "to", "make", "new", "simple", "quick", "tell", "me", "classic",
+    "functional", "marketing", "stories", "jokes", "codes", "analysis", "team", "plan",
+]
+
+def synthetic_queries(keywords, count, seed=42):
+    """Build queries of 6-14 words, about a quarter of them routing keywords"""
+    rng = random.Random(seed)
+    vocabulary = FILLER_WORDS * 3 + keywords
+    return [" ".join(rng.choices(vocabulary, k=rng.randint(6, 14))).capitalize() + "?" for _ in range(count)]
+
+def substring_scores(agents, query):
+    """The original scorer: `keyword in query` for every keyword of every agent"""
+    query_lower = query.lower()
+    return {key: sum(1 for keyword in agent["keywords"] if keyword in query_lower) for key, agent in agents.items()}
+
+def synthetic_agents(agent_count=20, keywords_per_agent=25, seed=7):
+    """Build a larger routing table of made-up keywords"""
+    rng = random.Random(seed)
+    def word():
+        return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 10)))
+    return {f"agent_{i}": {"keywords": [word() for _ in range(keywords_per_agent)]} for i in range(agent_count)}
+
+def run(label, score, queries):
+    start = time.perf_counter()
+    results = [score(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed:7.2f}s  {len(queries) / elapsed:>12,.0f} queries/s  "
+          f"{elapsed / len(queries) * 1e6:6.2f} µs/query")
+    return results
+
+def compare(title, agents, index, count):
+    """Benchmark both scorers on one routing table"""
+    keywords = [keyword for agent in agents.values() for keyword in agent["keywords"]]
+    print(f"\n{title}: {len(agents)} agents, {len(keywords)} keywords, {count:,} synthetic queries")
+    queries = synthetic_queries(keywords, count)
+
+    substring = run("substring scan", lambda query: substring_scores(agents, query), queries)
+    indexed = run("RoutingIndex", index.scores, queries)
+
+    differing = sum(1 for a, b in zip(substring, indexed) if a != b)
+    print(f"Scores differ on {differing:,} queries ({differing / count:.1%}), from substring hits "
+          "inside other words ('fun' in 'functional') and inflections the scan misses ('stories')")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    controller = MultiPersonaController()
+    compare("MultiPersonaController", controller.agents, controller.routing_index, count)
+
+    agents = synthetic_agents()
+    compare("Large routing table", agents,
+            RoutingIndex({key: agent["keywords"] for key, agent in agents.items()}), count)
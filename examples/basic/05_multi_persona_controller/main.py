@@ -1,5 +1,6 @@
 from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
+from helpers.routing_index import RoutingIndex
 
 class MultiPersonaController:
     def __init__(self):
@@ -78,19 +79,17 @@ Your personality traits:
                 "keywords": ["funny", "joke", "humor", "entertaining", "comedy", "laugh", "amusing", "witty", "fun", "lighthearted"]
             }
         }
+        
+        # Every agent's keywords compiled into one table of word forms, looked up in one pass per query
+        self.routing_index = RoutingIndex({key: agent["keywords"] for key, agent in self.agents.items()})
 
     def route_query(self, query):
         """
         Analyze query and determine which persona+LLM combination to use.
         Returns tuple of (agent_key, agent_info, reasoning)
         """
-        query_lower = query.lower()
-        scores = {}
-        
         # Calculate scores for each agent based on keyword matches
-        for agent_key, agent_info in self.agents.items():
-            score = sum(1 for keyword in agent_info["keywords"] if keyword in query_lower)
-            scores[agent_key] = score
+        scores = self.routing_index.scores(query)
         
         # Find the agent with the highest score
         best_agent = max(scores.keys(), key=lambda k: scores[k])
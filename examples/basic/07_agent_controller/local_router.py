@@ -0,0 +1,227 @@
+"""
+Local routing model: hashed n-gram features + multinomial naive Bayes
+
+Trains in milliseconds on CPU from labeled queries (routing_examples.jsonl plus
+the controller's own logged decisions) and scores a query in microseconds.
+Confidences are temperature-calibrated on leave-one-out predictions, so the
+controller can trust the model only where it is actually reliable.
+
+Usage:
+    python local_router.py train                 # train and save local_router.json
+    python local_router.py "Tell me a cat joke"  # route a query
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import zlib
+
+EXAMPLE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(EXAMPLE_DIR, "local_router.json")
+DEFAULT_EXAMPLES_PATH = os.path.join(EXAMPLE_DIR, "routing_examples.jsonl")
+DEFAULT_LABELS_PATH = os.path.join(EXAMPLE_DIR, "controller_labels.jsonl")
+
+# Model defaults
+DEFAULT_N_FEATURES = 2 ** 18
+DEFAULT_ALPHA = 0.1           # Additive smoothing
+CHAR_NGRAM = 4                # Character n-grams inside words ("programming" ~ "program")
+TEMPERATURES = [1, 1.5, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def query_features(query, n_features=DEFAULT_N_FEATURES):
+    """Hash a query into sparse feature counts (word unigrams, bigrams and character n-grams).
+
+    Args:
+        query: Query text
+        n_features: Size of the hashed feature space
+
+    Returns:
+        dict: feature index -> count
+    """
+    words = _TOKEN_PATTERN.findall(query.lower())
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"c:{padded[i:i + CHAR_NGRAM]}" for i in range(max(len(padded) - CHAR_NGRAM + 1, 1))]
+
+    features = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode()) % n_features  # Stable across processes, unlike hash()
+        features[index] = features.get(index, 0) + 1
+    return features
+
+def load_examples(*paths):
+    """Read labeled {"query": ..., "agent": ...} lines from JSONL files (missing files are skipped)"""
+    examples = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                if item.get("query") and item.get("agent"):
+                    examples.append((item["query"], item["agent"]))
+    return examples
+
+def log_label(query, agent_key, path=DEFAULT_LABELS_PATH, source="controller"):
+    """Append a routing decision as a new training label"""
+    with open(path, "a") as f:
+        f.write(json.dumps({"query": query, "agent": agent_key, "source": source}) + "\n")
+
+class LocalRouter:
+    """Multinomial naive Bayes over hashed n-gram features.
+
+    Args:
+        n_features: Size of the hashed feature space
+        alpha: Additive smoothing
+    """
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES, alpha=DEFAULT_ALPHA):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.temperature = 1.0
+        self.labels = []
+        self.doc_counts = {}     # label -> number of training queries
+        self.feature_counts = {}  # label -> {feature index: count}
+        self.totals = {}         # label -> total feature count
+
+    def fit(self, examples):
+        """Train on (query, agent_key) pairs and calibrate the temperature.
+
+        Returns:
+            LocalRouter: self
+        """
+        self.labels = sorted({label for _, label in examples})
+        self.doc_counts = {label: 0 for label in self.labels}
+        self.feature_counts = {label: {} for label in self.labels}
+        self.totals = {label: 0 for label in self.labels}
+        featurized = [(query_features(query, self.n_features), label) for query, label in examples]
+        for features, label in featurized:
+            self._add(features, label, 1)
+        self.temperature = self._calibrate(featurized)
+        return self
+
+    def _add(self, features, label, sign):
+        self.doc_counts[label] += sign
+        counts = self.feature_counts[label]
+        for index, count in features.items():
+            counts[index] = counts.get(index, 0) + sign * count
+            self.totals[label] += sign * count
+
+    def _log_scores(self, features):
+        """Unnormalized log posterior per label"""
+        n_docs = sum(self.doc_counts.values())
+        scores = {}
+        for label in self.labels:
+            counts = self.feature_counts[label]
+            denominator = math.log(self.totals[label] + self.alpha * self.n_features)
+            score = math.log((self.doc_counts[label] + 1) / (n_docs + len(self.labels)))
+            for index, count in features.items():
+                score += count * (math.log(counts.get(index, 0) + self.alpha) - denominator)
+            scores[label] = score
+        return scores
+
+    @staticmethod
+    def _softmax(scores, temperature):
+        top = max(scores.values())
+        weights = {label: math.exp((score - top) / temperature) for label, score in scores.items()}
+        total = sum(weights.values())
+        return {label: weight / total for label, weight in weights.items()}
+
+    def _calibrate(self, featurized):
+        """Pick the temperature minimizing the leave-one-out negative log likelihood.
+
+        Naive Bayes multiplies many correlated n-gram likelihoods, so its raw
+        posteriors are close to 0 or 1; dividing the log scores by a temperature
+        turns them into usable confidences.
+        """
+        if len(self.labels) < 2:
+            return 1.0
+        held_out = []
+        for features, label in featurized:
+            self._add(features, label, -1)
+            held_out.append((self._log_scores(features), label))
+            self._add(features, label, 1)
+
+        def nll(temperature):
+            return -sum(math.log(max(self._softmax(scores, temperature)[label], 1e-12))
+                        for scores, label in held_out)
+        return min(TEMPERATURES, key=nll)
+
+    def predict(self, query):
+        """Route a query.
+
+        Returns:
+            tuple: (agent_key, confidence), or (None, 0.0) if the model is untrained
+        """
+        if not self.labels:
+            return None, 0.0
+        probabilities = self.predict_proba(query)
+        best = max(probabilities, key=probabilities.get)
+        return best, probabilities[best]
+
+    def predict_proba(self, query):
+        """Calibrated probability per agent key"""
+        return self._softmax(self._log_scores(query_features(query, self.n_features)), self.temperature)
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        """Save the model as JSON"""
+        with open(path, "w") as f:
+            json.dump({
+                "n_features": self.n_features,
+                "alpha": self.alpha,
+                "temperature": self.temperature,
+                "doc_counts": self.doc_counts,
+                "feature_counts": {label: {str(i): c for i, c in counts.items() if c}
+                                   for label, counts in self.feature_counts.items()},
+            }, f)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """Load a model saved with save()"""
+        with open(path) as f:
+            data = json.load(f)
+        router = cls(n_features=data["n_features"], alpha=data["alpha"])
+        router.temperature = data["temperature"]
+        router.doc_counts = data["doc_counts"]
+        router.labels = sorted(router.doc_counts)
+        router.feature_counts = {label: {int(i): c for i, c in counts.items()}
+                                 for label, counts in data["feature_counts"].items()}
+        router.totals = {label: sum(counts.values()) for label, counts in router.feature_counts.items()}
+        return router
+
+def train(examples_paths=(DEFAULT_EXAMPLES_PATH, DEFAULT_LABELS_PATH), model_path=DEFAULT_MODEL_PATH):
+    """Train on the seed examples plus logged controller labels and save the model"""
+    router = LocalRouter().fit(load_examples(*examples_paths))
+    if model_path:
+        router.save(model_path)
+    return router
+
+def load_or_train(model_path=DEFAULT_MODEL_PATH):
+    """Load the saved model, or train one from the labeled examples if there is none"""
+    if os.path.exists(model_path):
+        return LocalRouter.load(model_path)
+    return train(model_path=None)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "train":
+        router = load_or_train()
+        for query in sys.argv[1:]:
+            agent_key, confidence = router.predict(query)
+            print(f"{agent_key} ({confidence:.0%}): {query}")
+    else:
+        import time
+        start = time.perf_counter()
+        examples = load_examples(DEFAULT_EXAMPLES_PATH, DEFAULT_LABELS_PATH)
+        router = train()
+        print(f"✅ Trained on {len(examples)} examples in {time.perf_counter() - start:.3f}s "
+              f"(temperature {router.temperature}) -> {DEFAULT_MODEL_PATH}")
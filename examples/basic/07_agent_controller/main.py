@@ -1,8 +1,32 @@
+import os
+import re
 from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
+from routing_cache import RoutingCache, agents_fingerprint
+from local_router import load_or_train, log_label
+from helpers.routing_index import RoutingIndex
+
+# Routing tiers, cheapest first
+ROUTING_TIERS = ("keyword", "local", "cache", "controller", "fallback")
+
+# Agent names the controller answers with
+AGENT_KEYS_BY_NAME = {
+    "Dr. Code": "dr_code",
+    "Creative Writer": "creative_writer",
+    "Business Analyst": "business_analyst",
+    "Witty Comedian": "witty_comedian"
+}
+
+# Streamed decisions: a full agent name after SELECTED_AGENT: (markdown and brackets tolerated),
+# and a REASONING: line ended by a newline
+_DECISION_PATTERN = re.compile(
+    r"SELECTED_AGENT:\**\s*\[?\s*(" + "|".join(re.escape(name) for name in AGENT_KEYS_BY_NAME) + r")(?!\w)"
+)
+_REASONING_PATTERN = re.compile(r"REASONING:\**\s*(.*?)\s*\n")
 
 class AgentBasedController:
-    def __init__(self):
+    def __init__(self, routing_cache=None, keyword_margin=1, local_router=None, local_confidence=0.8,
+                 label_log_path=None):
         # Controller agent uses Mistral for routing decisions
         self.controller_llm = ChatOpenAI(
             model="mistral", 
@@ -61,7 +85,9 @@ Your personality traits:
                     "Algorithm design and data structures",
                     "Code review and best practices",
                     "System architecture and design patterns"
-                ]
+                ],
+                # Keyword tier of the routing cascade (same keywords as Example 5)
+                "keywords": ["code", "programming", "python", "javascript", "algorithm", "function", "debug", "technical", "software", "development"]
             },
             
             "creative_writer": {
@@ -83,7 +109,8 @@ Your personality traits:
                     "Character development and dialogue",
                     "Literary analysis and critique",
                     "Imaginative and artistic content"
-                ]
+                ],
+                "keywords": ["story", "creative", "write", "poem", "narrative", "fiction", "artistic", "literature", "tale", "imagination"]
             },
             
             "business_analyst": {
@@ -105,7 +132,8 @@ Your personality traits:
                     "Process optimization and efficiency",
                     "Risk assessment and management",
                     "Professional consulting and advice"
-                ]
+                ],
+                "keywords": ["business", "analysis", "strategy", "market", "revenue", "profit", "company", "enterprise", "professional", "corporate"]
             },
             
             "witty_comedian": {
@@ -127,13 +155,117 @@ Your personality traits:
                     "Witty observations and commentary",
                     "Fun and engaging content",
                     "Amusing takes on serious topics"
-                ]
+                ],
+                "keywords": ["funny", "joke", "humor", "entertaining", "comedy", "laugh", "amusing", "witty", "fun", "lighthearted"]
             }
         }
 
-    def select_agent(self, query):
+        # Routing decisions keyed on the normalized query; set ROUTING_CACHE_PATH to keep them across runs
+        self.routing_cache = routing_cache or RoutingCache(path=os.getenv("ROUTING_CACHE_PATH"))
+        self.routing_cache.set_fingerprint(agents_fingerprint(self.specialist_agents))
+        
+        # Keyword decisions are accepted when the best score leads the runner-up by this much
+        self.keyword_margin = keyword_margin
+        self.routing_index = None
+        self._routing_keywords = None  # Keyword lists the routing index was compiled from
+        
+        # Local naive Bayes tier, trusted at or above local_confidence (see local_router.py).
+        # With label_log_path set (e.g. local_router.DEFAULT_LABELS_PATH), controller decisions
+        # are appended there so a retrained model learns the controller's choices; it is off by
+        # default so running the example doesn't change files on disk
+        self.local_router = local_router or load_or_train()
+        self.local_confidence = local_confidence
+        self.label_log_path = label_log_path
+        self.last_tier = None
+        self.tier_counts = {tier: 0 for tier in ROUTING_TIERS}
+
+    def keyword_scores(self, query):
+        """
+        Count keyword matches per agent with the shared RoutingIndex (the Example 5 scorer)
+        """
+        keywords = {agent_key: tuple(agent_info["keywords"]) for agent_key, agent_info in self.specialist_agents.items()}
+        if keywords != self._routing_keywords:
+            # First use, or specialist_agents was edited: recompile the index
+            self.routing_index = RoutingIndex(keywords)
+            self._routing_keywords = keywords
+        return self.routing_index.scores(query)
+
+    def route_by_keywords(self, query):
+        """
+        Keyword tier: returns (agent_key, scores), agent_key being None when
+        the query is ambiguous (no match, or the top two scores are closer
+        than keyword_margin)
+        """
+        scores = self.keyword_scores(query)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best_score = scores[ranked[0]]
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0
+        if best_score == 0 or best_score - runner_up < self.keyword_margin:
+            return None, scores
+        return ranked[0], scores
+
+    def select_agent(self, query, use_cache=True, cascade=True, stream=False, capture_reasoning=True):
+        """
+        Select the best specialist with a routing cascade
+        
+        1. keyword: accept a clear keyword winner (no LLM call)
+        2. local: accept the local model's prediction if it is confident enough
+        3. cache: reuse the decision for a repeated query
+        4. controller: ask the controller LLM (only queries the cheaper tiers can't settle)
+        5. fallback: Dr. Code, when the controller names no valid agent
+        
+        Returns (agent_key, reasoning, decision_text); the deciding tier is
+        stored in last_tier and counted in tier_counts. Only valid controller
+        decisions are cached, and the cache is dropped whenever
+        specialist_agents changes. stream and capture_reasoning are passed to
+        ask_controller.
+        """
+        if cascade:
+            agent_key, scores = self.route_by_keywords(query)
+            if agent_key is not None:
+                name = self.specialist_agents[agent_key]["name"]
+                reasoning = f"Clear keyword match for {name} (scores: {scores})"
+                return self._decided("keyword", agent_key, reasoning,
+                                     f"SELECTED_AGENT: {name}\nREASONING: {reasoning}")
+            
+            agent_key, confidence = self.local_router.predict(query)
+            if agent_key in self.specialist_agents and confidence >= self.local_confidence:
+                name = self.specialist_agents[agent_key]["name"]
+                reasoning = f"Local routing model picked {name} (confidence: {confidence:.0%})"
+                return self._decided("local", agent_key, reasoning,
+                                     f"SELECTED_AGENT: {name}\nREASONING: {reasoning}")
+        
+        if use_cache:
+            # Cheap hash of the agent definitions, so edits to specialist_agents invalidate the cache
+            self.routing_cache.set_fingerprint(agents_fingerprint(self.specialist_agents))
+            cached = self.routing_cache.get(query)
+            if cached is not None:
+                return self._decided("cache", *cached)
+        
+        selected_agent, reasoning, decision_text = self.ask_controller(query, stream, capture_reasoning)
+        if selected_agent is None:
+            return self._decided("fallback", "dr_code", reasoning, decision_text)
+        
+        if use_cache:
+            self.routing_cache.put(query, selected_agent, reasoning, decision_text)
+        if self.label_log_path:
+            log_label(query, selected_agent, self.label_log_path)
+        return self._decided("controller", selected_agent, reasoning, decision_text)
+
+    def _decided(self, tier, agent_key, reasoning, decision_text):
+        """Record which tier decided and return the decision"""
+        self.last_tier = tier
+        self.tier_counts[tier] += 1
+        return agent_key, reasoning, decision_text
+
+    def ask_controller(self, query, stream=False, capture_reasoning=True):
         """
         Use the controller agent to intelligently select the best specialist
+        
+        Returns (agent_key, reasoning, decision_text); agent_key is None when
+        the controller's answer named no valid agent. With stream=True the
+        decision is read as tokens arrive and the generation is stopped once
+        it is known (see stream_decision).
         """
         import random
         
@@ -207,10 +339,15 @@ Available agent names: Dr. Code, Creative Writer, Business Analyst, Witty Comedi
             HumanMessage(content=controller_prompt)
         ]
         
-        response = self.controller_llm.invoke(messages)
+        if stream:
+            selected_agent, reasoning, decision_text = self.stream_decision(messages, capture_reasoning)
+            if selected_agent is not None:
+                return selected_agent, reasoning, decision_text
+            # No decision recognized while streaming: parse the full answer below
+        else:
+            decision_text = self.controller_llm.invoke(messages).content
         
         # Parse the controller's decision
-        decision_text = response.content
         selected_agent = None
         reasoning = "No reasoning provided"
         
@@ -221,24 +358,57 @@ Available agent names: Dr. Code, Creative Writer, Business Analyst, Witty Comedi
                 if line_stripped.startswith('SELECTED_AGENT:'):
                     agent_name = line_stripped.split(':', 1)[1].strip()
                     # Map agent names to keys
-                    name_to_key = {
-                        "Dr. Code": "dr_code", 
-                        "Creative Writer": "creative_writer",
-                        "Business Analyst": "business_analyst",
-                        "Witty Comedian": "witty_comedian"
-                    }
-                    selected_agent = name_to_key.get(agent_name)
+                    selected_agent = AGENT_KEYS_BY_NAME.get(agent_name)
                 elif line_stripped.startswith('REASONING:'):
                     reasoning = line_stripped.split(':', 1)[1].strip()
         except:
-            # Fallback to dr_code if parsing fails
-            selected_agent = "dr_code"
+            # Fallback to dr_code if parsing fails (applied by select_agent)
+            selected_agent = None
             reasoning = "Parsing failed, defaulting to Dr. Code"
+        else:
+            if selected_agent is None:
+                reasoning = "No valid agent selected, defaulting to Dr. Code"
         
-        if selected_agent is None:
-            selected_agent = "dr_code"
-            reasoning = "No valid agent selected, defaulting to Dr. Code"
+        return selected_agent, reasoning, decision_text
+
+    def stream_decision(self, messages, capture_reasoning=True):
+        """
+        Stream the controller's answer and stop as soon as the decision is known
+        
+        The decision is committed once a full agent name follows
+        SELECTED_AGENT:. Without capture_reasoning the stream is closed right
+        there; otherwise it is closed after the REASONING: line. Closing the
+        stream drops the connection, which stops the rest of the generation.
         
+        Returns (agent_key, reasoning, decision_text); agent_key is None if
+        the stream ended without a recognizable decision, and decision_text is
+        the text received so far.
+        """
+        decision_text = ""
+        selected_agent = None
+        reasoning = "Reasoning not captured (streamed decision)"
+        chunks = self.controller_llm.stream(messages)
+        try:
+            for chunk in chunks:
+                decision_text += chunk.content
+                if selected_agent is None:
+                    match = _DECISION_PATTERN.search(decision_text)
+                    if match is None:
+                        continue
+                    selected_agent = AGENT_KEYS_BY_NAME[match.group(1)]
+                    if not capture_reasoning:
+                        break
+                match = _REASONING_PATTERN.search(decision_text)
+                if match is not None:
+                    reasoning = match.group(1)
+                    break
+            else:
+                # Stream finished: the reasoning may end without a newline
+                match = re.search(r"REASONING:\**\s*(.+)", decision_text)
+                if selected_agent is not None and capture_reasoning and match is not None:
+                    reasoning = match.group(1).strip()
+        finally:
+            chunks.close()
         return selected_agent, reasoning, decision_text
 
     def process_query(self, query):
@@ -254,10 +424,11 @@ Available agent names: Dr. Code, Creative Writer, Business Analyst, Witty Comedi
         # Step 1: Controller selects the best agent
         print("🤖 CONTROLLER DECISION:")
         print("-" * 50)
-        selected_agent_key, reasoning, full_decision = self.select_agent(query)
+        selected_agent_key, reasoning, full_decision = self.select_agent(query, stream=True)
         selected_agent = self.specialist_agents[selected_agent_key]
         
         print(f"Selected Agent: {selected_agent['name']} ({selected_agent['model_name']})")
+        print(f"Decided by: {self.last_tier} tier")
         print(f"Reasoning: {reasoning}")
         print()
         print("Full Controller Response:")
@@ -298,4 +469,8 @@ if __name__ == "__main__":
         print(f"\n{'='*10} TEST QUERY {i} {'='*10}")
         controller.process_query(query)
         if i < len(test_queries):
-            print("\n" + "⏸️ " * 20 + "\n")
\ No newline at end of file
+            print("\n" + "⏸️ " * 20 + "\n")
+    
+    stats = controller.routing_cache.stats()
+    print(f"\n🗂️  Routing cache: {stats['hits']} hits, {stats['misses']} misses")
+    print(f"🪜 Routing tiers: {controller.tier_counts}")
\ No newline at end of file
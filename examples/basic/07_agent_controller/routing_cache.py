@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Cache defaults
+DEFAULT_ROUTING_CACHE_MAX_ENTRIES = 1024
+
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)*')
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s#]")
+
+def normalize_query(query):
+    """Normalize a query so near-identical queries share a routing decision.
+
+    Lowercases, masks numbers with '#', drops punctuation and collapses
+    whitespace: "Explain  Python 3.12!" and "explain python 3.11" both become
+    "explain python #".
+    """
+    text = _NUMBER_PATTERN.sub('#', query.lower())
+    text = _PUNCTUATION_PATTERN.sub('', text)
+    return ' '.join(text.split())
+
+def agents_fingerprint(specialist_agents):
+    """Hash the routing-relevant parts of the specialist agents (names, models, personas, specialties)"""
+    payload = {
+        key: {field: agent.get(field) for field in ('name', 'model_name', 'persona', 'specialties')}
+        for key, agent in specialist_agents.items()
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class RoutingCache:
+    """Cache of controller routing decisions keyed on the normalized query.
+
+    Decisions are kept in a bounded in-memory LRU and, if a path is given, in
+    a SQLite file shared across runs. Every entry is tagged with the
+    fingerprint of the specialist agents it was made for; when the agents
+    change (see set_fingerprint) the old decisions are dropped.
+
+    Args:
+        max_entries: Maximum number of decisions kept in memory
+        path: Optional SQLite database file for a persistent store
+    """
+
+    def __init__(self, max_entries=DEFAULT_ROUTING_CACHE_MAX_ENTRIES, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.fingerprint = None
+        self._entries = OrderedDict()  # normalized query -> (agent_key, reasoning, decision_text)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+        if path:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS routes (
+                        query TEXT PRIMARY KEY,
+                        agent_key TEXT NOT NULL,
+                        reasoning TEXT,
+                        decision_text TEXT,
+                        fingerprint TEXT,
+                        created_at REAL NOT NULL
+                    )
+                """)
+
+    def _connect(self):
+        """Get this thread's connection (SQLite connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def set_fingerprint(self, fingerprint):
+        """Bind the cache to a set of specialist agents, dropping decisions made for others.
+
+        Args:
+            fingerprint: agents_fingerprint() of the current specialist agents
+
+        Returns:
+            bool: True if the cache was invalidated
+        """
+        if fingerprint == self.fingerprint:
+            return False
+        with self._lock:
+            changed = self.fingerprint is not None
+            self.fingerprint = fingerprint
+            self._entries.clear()
+            if changed:
+                self._stats['invalidations'] += 1
+        if self.path:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM routes WHERE fingerprint IS NOT ?", (fingerprint,))
+        return changed
+
+    def get(self, query):
+        """Get the cached (agent_key, reasoning, decision_text) for a query, or None"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry
+
+        if self.path:
+            row = self._connect().execute(
+                "SELECT agent_key, reasoning, decision_text FROM routes WHERE query = ? AND fingerprint IS ?",
+                (key, self.fingerprint)
+            ).fetchone()
+            if row is not None:
+                self._remember(key, tuple(row))
+                with self._lock:
+                    self._stats['hits'] += 1
+                return tuple(row)
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def put(self, query, agent_key, reasoning, decision_text=None):
+        """Store a routing decision for a query"""
+        key = normalize_query(query)
+        entry = (agent_key, reasoning, decision_text)
+        self._remember(key, entry)
+        if self.path:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO routes (query, agent_key, reasoning, decision_text, fingerprint, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, agent_key, reasoning, decision_text, self.fingerprint, time.time())
+                )
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached decision (memory and persistent store)"""
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+        if self.path:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM routes")
+
+    def stats(self):
+        """Get hit/miss counters, hit rate and the number of decisions in memory"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
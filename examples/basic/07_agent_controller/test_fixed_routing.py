@@ -47,7 +47,7 @@ for i, test_case in enumerate(test_cases, 1):
     print(f"Expected: {test_case['expected']}")
     print("-" * 50)
     
-    selected_agent_key, reasoning, full_decision = controller.select_agent(test_case['query'])
+    selected_agent_key, reasoning, full_decision = controller.select_agent(test_case['query'], cascade=False, use_cache=False)
     selected_agent = controller.specialist_agents[selected_agent_key]
     
     print(f"Selected: {selected_agent['name']} ({selected_agent['model_name']})")
@@ -10,7 +10,7 @@ print("=" * 50)
 print(f"Query: {test_query}")
 print()
 
-selected_agent_key, reasoning, full_decision = controller.select_agent(test_query)
+selected_agent_key, reasoning, full_decision = controller.select_agent(test_query, cascade=False, use_cache=False)
 selected_agent = controller.specialist_agents[selected_agent_key]
 
 print("Controller Decision:")
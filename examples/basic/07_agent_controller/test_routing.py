@@ -19,7 +19,7 @@ for i, query in enumerate(test_queries, 1):
     print(f"\nTest {i}: {query}")
     print("-" * 50)
     
-    selected_agent_key, reasoning, full_decision = controller.select_agent(query)
+    selected_agent_key, reasoning, full_decision = controller.select_agent(query, cascade=False, use_cache=False)
     selected_agent = controller.specialist_agents[selected_agent_key]
     
     print(f"Selected: {selected_agent['name']} ({selected_agent['model_name']})")
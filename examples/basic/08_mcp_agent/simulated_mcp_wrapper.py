@@ -11,8 +11,10 @@ For real MCP integration, you would use the actual MCP Python SDK with ClientSes
 import asyncio
 from typing import Dict, List, Any
 from langchain.tools import tool
+from langchain_core.tools import ToolException
 import tempfile
 import os
+from helpers.tool_memo import memoize_tools
 
 
 class SimulatedMCPWrapper:
@@ -97,13 +99,21 @@ class SimulatedMCPWrapper:
                 return f"Files in temp directory (via MCP):\n\n{file_list}"
                 
             else:
-                return f"Unknown tool '{tool_name}' on server '{server_name}'"
+                raise ToolException(f"Unknown tool '{tool_name}' on server '{server_name}'")
                 
+        except ToolException:
+            raise
         except Exception as e:
-            return f"MCP call failed: {str(e)}"
+            raise ToolException(f"MCP call failed: {str(e)}")
     
-    def get_langchain_tools(self):
-        """Get LangChain tools that wrap MCP server capabilities"""
+    def get_langchain_tools(self, memoize: bool = False):
+        """Get LangChain tools that wrap MCP server capabilities
+        
+        Args:
+            memoize: Answer repeated identical calls to the pure tools (the
+                calculator ones) from the shared tool memo cache instead of
+                calling the MCP server again
+        """
         
         @tool
         def mcp_calculator_add(input_text: str) -> str:
@@ -117,10 +127,10 @@ class SimulatedMCPWrapper:
                 elif ' ' in input_text:
                     parts = input_text.split()
                 else:
-                    return "Please provide two numbers separated by comma or space"
+                    raise ToolException("Please provide two numbers separated by comma or space")
                 
                 if len(parts) != 2:
-                    return f"Expected 2 numbers, got {len(parts)}: {input_text}"
+                    raise ToolException(f"Expected 2 numbers, got {len(parts)}: {input_text}")
                 
                 a = float(parts[0].strip())
                 b = float(parts[1].strip())
@@ -133,8 +143,10 @@ class SimulatedMCPWrapper:
                     )
                 finally:
                     loop.close()
+            except ToolException:
+                raise
             except Exception as e:
-                return f"Error parsing input '{input_text}': {str(e)}"
+                raise ToolException(f"Error parsing input '{input_text}': {str(e)}")
         
         @tool
         def mcp_calculator_multiply(input_text: str) -> str:
@@ -148,10 +160,10 @@ class SimulatedMCPWrapper:
                 elif ' ' in input_text:
                     parts = input_text.split()
                 else:
-                    return "Please provide two numbers separated by comma or space"
+                    raise ToolException("Please provide two numbers separated by comma or space")
                 
                 if len(parts) != 2:
-                    return f"Expected 2 numbers, got {len(parts)}: {input_text}"
+                    raise ToolException(f"Expected 2 numbers, got {len(parts)}: {input_text}")
                 
                 a = float(parts[0].strip())
                 b = float(parts[1].strip())
@@ -164,8 +176,10 @@ class SimulatedMCPWrapper:
                     )
                 finally:
                     loop.close()
+            except ToolException:
+                raise
             except Exception as e:
-                return f"Error parsing input '{input_text}': {str(e)}"
+                raise ToolException(f"Error parsing input '{input_text}': {str(e)}")
         
         @tool
         def mcp_web_search(query: str) -> str:
@@ -204,13 +218,23 @@ class SimulatedMCPWrapper:
             finally:
                 loop.close()
         
-        return [
+        # Calculator results only depend on the input; search and file results can change
+        mcp_calculator_add.metadata = {"pure": True}
+        mcp_calculator_multiply.metadata = {"pure": True}
+        
+        tools = [
             mcp_calculator_add,
             mcp_calculator_multiply, 
             mcp_web_search,
             mcp_file_read,
             mcp_file_list
         ]
+        # Failures raise ToolException (so they are never memoized) and reach the agent as text
+        for mcp_tool in tools:
+            mcp_tool.handle_tool_error = True
+        if memoize:
+            return memoize_tools(tools)
+        return tools
 
 
 # Global instance for easy access
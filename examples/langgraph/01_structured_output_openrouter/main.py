@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import TypedDict, List
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
@@ -12,8 +13,13 @@ class AgentState(TypedDict):
     messages: List[HumanMessage | AIMessage]
     structured_response: WeatherResponse | TaskAnalysisResponse | PersonResponse | None
 
+@lru_cache(maxsize=None)
 def configure_llm():
-    """Configure the LLM with OpenRouter settings"""
+    """Configure the LLM with OpenRouter settings.
+
+    The client is built once and shared by every node, so each query reuses the
+    same keep-alive connection pool instead of opening a new one.
+    """
     """return ChatOpenAI(
         api_key=os.getenv("OPENROUTER_API_KEY"),
         base_url=os.getenv("OPENROUTER_BASE_URL"),
@@ -1,5 +1,6 @@
 import os
 import time
+from functools import lru_cache
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
@@ -8,8 +9,12 @@ from tools import get_calculator_tools
 
 load_dotenv()
 
+@lru_cache(maxsize=None)
 def configure_llm():
-    """Configure the LLM with OpenRouter or local Ollama settings"""
+    """Configure the LLM with OpenRouter or local Ollama settings
+
+    The client is built once and shared, so its connection pool is reused.
+    """
     # Check if OpenRouter configuration is available
     """if os.getenv("OPENROUTER_API_KEY"):
         return ChatOpenAI(
@@ -27,8 +32,9 @@ def configure_llm():
         temperature=0.1
     )
 
+@lru_cache(maxsize=None)
 def create_calculator_agent():
-    """Create a ReAct agent with calculator tools"""
+    """Create a ReAct agent with calculator tools (compiled once and reused)"""
     llm = configure_llm()
     tools = get_calculator_tools()
     
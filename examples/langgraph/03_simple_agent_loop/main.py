@@ -1,12 +1,39 @@
 # from typing import Literal  # Removed as not needed with simplified type hints
+import time
+import asyncio
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, ToolMessage, HumanMessage
+from typing import Optional
+from langchain_core.messages import SystemMessage, ToolMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import MessagesState, StateGraph, START, END
 from tools import get_tools, get_tools_by_name
+from plan_execute import create_plan_execute_agent
+from helpers.message_compaction import compact_messages
+from helpers.agent_budget import RunBudget, STOP_MESSAGES, split_repeated_calls
 
 load_dotenv()
 
+# Maximum number of tool calls from one turn that run at the same time
+MAX_TOOL_WORKERS = 8
+
+# History compaction before each LLM call: older tool calls are sent as a
+# one-line-per-call scratchpad ("add(3,4)=7") instead of full messages
+KEEP_TURNS = 2          # Most recent turns sent verbatim
+MAX_PROMPT_TOKENS = 0   # Token budget for the history (0 = no budget)
+
+# Per-run limits: LLM calls, tool calls, deadline and repeated identical tool calls
+BUDGET = RunBudget()
+
+class AgentLoopState(MessagesState):
+    """Messages plus the per-run budget counters"""
+    llm_calls: int
+    tool_calls: int
+    started_at: float
+    budget_exhausted: Optional[str]
+
 def configure_llm():
     """Configure the LLM with OpenRouter or local Ollama settings"""
     # Check if OpenRouter configuration is available
@@ -33,9 +60,17 @@ tools_by_name = get_tools_by_name()
 llm_with_tools = llm.bind_tools(tools)
 
 # Nodes
-def llm_call(state: MessagesState):
+def llm_call(state: AgentLoopState):
     """LLM decides whether to call a tool or not"""
     
+    started_at = state.get("started_at") or time.time()
+    llm_calls = state.get("llm_calls", 0)
+    
+    # Stop instead of calling the LLM once the run is over budget
+    reason = BUDGET.exceeded(llm_calls, state.get("tool_calls", 0), started_at)
+    if reason:
+        return {"messages": [AIMessage(content=STOP_MESSAGES[reason])], "budget_exhausted": reason}
+    
     return {
         "messages": [
             llm_with_tools.invoke(
@@ -44,23 +79,107 @@ def llm_call(state: MessagesState):
                         content="You are a helpful assistant tasked with performing arithmetic on a set of inputs."
                     )
                 ]
-                + state["messages"]
+                + compact_messages(state["messages"], KEEP_TURNS, MAX_PROMPT_TOKENS)
             )
-        ]
+        ],
+        "llm_calls": llm_calls + 1,
+        "started_at": started_at,
     }
 
-def tool_node(state: MessagesState):
-    """Performs the tool call"""
-    
-    result = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool = tools_by_name[tool_call["name"]]
+# Shared pool for dispatching the tool calls of a turn concurrently
+tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+
+def invoke_tool(tool_call):
+    """Run a single tool call and build its ToolMessage with timing metadata"""
+    tool = tools_by_name[tool_call["name"]]
+    started_at = time.time()
+    start = time.perf_counter()
+    if tool.func is None and tool.coroutine is not None:
+        # Async-only tool: run it on its own event loop in this worker thread
+        observation = asyncio.run(tool.ainvoke(tool_call["args"]))
+    else:
         observation = tool.invoke(tool_call["args"])
-        result.append(ToolMessage(content=str(observation), tool_call_id=tool_call["id"], name=tool_call["name"]))
-    return {"messages": result}
+    duration = time.perf_counter() - start
+    return ToolMessage(
+        content=str(observation),
+        tool_call_id=tool_call["id"],
+        name=tool_call["name"],
+        response_metadata={"started_at": started_at, "duration": duration},
+    )
+
+async def ainvoke_tool(tool_call):
+    """Async version of invoke_tool"""
+    tool = tools_by_name[tool_call["name"]]
+    started_at = time.time()
+    start = time.perf_counter()
+    observation = await tool.ainvoke(tool_call["args"])
+    duration = time.perf_counter() - start
+    return ToolMessage(
+        content=str(observation),
+        tool_call_id=tool_call["id"],
+        name=tool_call["name"],
+        response_metadata={"started_at": started_at, "duration": duration},
+    )
+
+def budget_tool_turn(state: AgentLoopState):
+    """Apply loop detection and the tool budget to the last turn's tool calls
+    
+    Returns:
+        tuple: (tool calls to run, dict of tool_call_id -> ToolMessage already
+        answered, state update)
+    """
+    messages = state["messages"]
+    tool_calls = messages[-1].tool_calls
+    fresh, repeats, looping = split_repeated_calls(messages[:-1], tool_calls, BUDGET.max_repeats)
+    total_tool_calls = state.get("tool_calls", 0) + len(fresh)
+    reason = "loop" if looping else BUDGET.exceeded(tool_calls=total_tool_calls, started_at=state.get("started_at"))
+    
+    if reason:
+        answered = {tool_call["id"]: ToolMessage(content=f"Not run: {STOP_MESSAGES[reason]}",
+                                                 tool_call_id=tool_call["id"], name=tool_call["name"])
+                    for tool_call in tool_calls}
+        return [], answered, {"budget_exhausted": reason}
+    
+    # Identical calls that already ran get their earlier result
+    answered = {tool_call["id"]: ToolMessage(content=repeats[tool_call["id"]], tool_call_id=tool_call["id"],
+                                             name=tool_call["name"], response_metadata={"repeated": True})
+                for tool_call in tool_calls if tool_call["id"] in repeats}
+    return fresh, answered, {"tool_calls": total_tool_calls}
+
+def finish_tool_turn(state: AgentLoopState, answered, update):
+    """Order the ToolMessages like the tool calls and add the stop message if the budget ran out"""
+    messages = [answered[tool_call["id"]] for tool_call in state["messages"][-1].tool_calls]
+    if update.get("budget_exhausted"):
+        messages.append(AIMessage(content=STOP_MESSAGES[update["budget_exhausted"]]))
+    return dict(update, messages=messages)
+
+def tool_node(state: AgentLoopState):
+    """Performs the tool calls of the last turn concurrently
+    
+    ToolMessages are returned in the same order as the tool calls, whatever
+    order the calls finish in. Each message carries its start time and
+    duration in response_metadata. Repeated identical calls are answered
+    with their earlier result, and the run stops when the budget runs out.
+    """
+    
+    to_run, answered, update = budget_tool_turn(state)
+    if len(to_run) == 1:
+        results = [invoke_tool(to_run[0])]
+    else:
+        results = tool_executor.map(invoke_tool, to_run)
+    answered.update((message.tool_call_id, message) for message in results)
+    return finish_tool_turn(state, answered, update)
+
+async def atool_node(state: AgentLoopState):
+    """Async version of tool_node, used when the agent runs with astream/ainvoke"""
+    
+    to_run, answered, update = budget_tool_turn(state)
+    results = await asyncio.gather(*(ainvoke_tool(tool_call) for tool_call in to_run))
+    answered.update((message.tool_call_id, message) for message in results)
+    return finish_tool_turn(state, answered, update)
 
 # Conditional edge function to route to the tool node or end based upon whether the LLM made a tool call
-def should_continue(state: MessagesState):
+def should_continue(state: AgentLoopState):
     """Decide if we should continue the loop or stop based upon whether the LLM made a tool call"""
     
     messages = state["messages"]
@@ -71,15 +190,26 @@ def should_continue(state: MessagesState):
     # Otherwise, we stop (reply to the user)
     return END
 
+def after_tools(state: AgentLoopState):
+    """Loop back to the LLM unless the tool turn used up the budget"""
+    if state.get("budget_exhausted"):
+        return END
+    return "llm_call"
+
+@lru_cache(maxsize=None)
 def create_agent():
-    """Build and compile the agent"""
+    """Build and compile the agent
+
+    The graph only depends on the module-level model, tools and prompt, so it
+    is compiled once and the same (thread-safe) graph serves every query.
+    """
     
     # Build workflow
-    agent_builder = StateGraph(MessagesState)
+    agent_builder = StateGraph(AgentLoopState)
     
     # Add nodes
     agent_builder.add_node("llm_call", llm_call)
-    agent_builder.add_node("environment", tool_node)
+    agent_builder.add_node("environment", RunnableLambda(tool_node, afunc=atool_node))
     
     # Add edges to connect nodes
     agent_builder.add_edge(START, "llm_call")
@@ -92,7 +222,7 @@ def create_agent():
             END: END,
         },
     )
-    agent_builder.add_edge("environment", "llm_call")
+    agent_builder.add_conditional_edges("environment", after_tools, {"llm_call": "llm_call", END: END})
     
     # Compile the agent
     return agent_builder.compile()
@@ -106,6 +236,9 @@ def print_step_details(step_num, chunk):
     for node_name, data in chunk.items():
         print(f"\n🔵 Node: {node_name}")
         
+        if data.get('budget_exhausted'):
+            print(f"⛔ Budget exhausted: {data['budget_exhausted']}")
+        
         if 'messages' in data:
             for message in data['messages']:
                 if hasattr(message, 'tool_calls') and message.tool_calls:
@@ -119,6 +252,8 @@ def print_step_details(step_num, chunk):
                     print(f"🛠️  Tool Result:")
                     print(f"   Tool: {message.name}")
                     print(f"   Result: {message.content}")
+                    if 'duration' in message.response_metadata:
+                        print(f"   Time: {message.response_metadata['duration'] * 1000:.1f} ms")
                 
                 elif hasattr(message, 'content') and (not hasattr(message, 'tool_calls') or not message.tool_calls):
                     print(f"💬 AI Response:")
@@ -141,6 +276,32 @@ def run_agent_example(query: str):
     print(f"\n{'✅ EXECUTION COMPLETE':<60}")
     print('='*80)
 
+@lru_cache(maxsize=None)
+def get_plan_execute_agent(respond: bool = True):
+    """Build and compile the plan-and-execute agent once per respond setting"""
+    return create_plan_execute_agent(llm, tools, respond=respond)
+
+def warm_up():
+    """Compile every agent graph up front so queries never pay for it"""
+    create_agent()
+    get_plan_execute_agent(True)
+
+def run_plan_execute_example(query: str, respond: bool = True):
+    """Run the plan-and-execute agent: one planning call, local execution, optional answer call"""
+    print(f"\n{'🗺️  PLAN-AND-EXECUTE':<60}")
+    print(f"Query: {query}")
+    print('='*80)
+    
+    agent = get_plan_execute_agent(respond)
+    
+    step_num = 1
+    for chunk in agent.stream({"messages": [HumanMessage(content=query)]}):
+        print_step_details(step_num, chunk)
+        step_num += 1
+    
+    print(f"\n{'✅ EXECUTION COMPLETE':<60}")
+    print('='*80)
+
 def main():
     """Main function demonstrating the simple agent loop"""
     print("LangGraph Simple Agent Loop Example")
@@ -152,6 +313,9 @@ def main():
     print("• Each iteration: reason → act → observe")
     print("• Natural exit when task is complete")
     
+    # Compile the graphs once, before the first query
+    warm_up()
+    
     # Test cases demonstrating multi-step reasoning
     test_cases = [
         "Add 3 and 4",
@@ -170,6 +334,17 @@ def main():
         except Exception as e:
             print(f"❌ Error: {e}")
     
+    # Same queries with a single planning call instead of one LLM call per step
+    for i, query in enumerate(test_cases, 1):
+        print(f"\n\n{'='*80}")
+        print(f"PLAN-AND-EXECUTE CASE {i}/{len(test_cases)}")
+        print('='*80)
+        
+        try:
+            run_plan_execute_example(query)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+    
     print(f"\n\n{'🎉 ALL TESTS COMPLETED!':<60}")
     print("=" * 80)
     print("\nWhat we learned:")
@@ -177,6 +352,7 @@ def main():
     print("• When and why loops terminate (no more tool calls)")
     print("• How state accumulates through iterations")
     print("• Multi-step problem solving in action")
+    print("• Planning all steps at once trades the loop for one or two LLM calls")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,236 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+# Maximum number of independent plan steps that run at the same time
+MAX_PARALLEL_STEPS = 8
+
+# Prefix marking an argument that references the result of an earlier step
+STEP_REFERENCE = "$"
+
+# Shared pool for running the independent steps of a plan level
+step_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_STEPS, thread_name_prefix="plan")
+
+class PlanStep(BaseModel):
+    """A single tool call in a plan"""
+    id: str = Field(description="Unique step id, e.g. 's1'")
+    tool: str = Field(description="Name of the tool to call")
+    args: Dict[str, Union[float, str]] = Field(
+        description="Tool arguments; use \"$<step id>\" (e.g. \"$s1\") to pass the result of an earlier step"
+    )
+
+class Plan(BaseModel):
+    """Plan of tool calls that answers the user's request"""
+    steps: List[PlanStep] = Field(description="Tool calls to run; the last step produces the final answer")
+
+class PlanExecuteState(MessagesState):
+    plan: Optional[Plan]
+    results: Dict[str, object]
+
+PLANNER_PROMPT = """You are a planner for a calculator assistant. Do not compute anything yourself.
+Break the user's request into tool calls and return them as a plan. Give each step a unique id
+(s1, s2, ...). When a step needs the result of an earlier step, pass "$<step id>" as the argument
+(for example {{"a": "$s1", "b": 2}}). Steps that do not depend on each other run in parallel.
+The last step must produce the final answer.
+
+Available tools:
+{tools}"""
+
+RESPONDER_PROMPT = """You are a helpful assistant. The user's request was answered by running the
+tool steps below. Reply to the user with the final result in one or two sentences."""
+
+def plan_levels(plan, tools_by_name):
+    """Validate a plan and group its steps into levels of independent steps.
+
+    Args:
+        plan: The Plan to check
+        tools_by_name: Available tools indexed by name
+
+    Returns:
+        list: Lists of PlanSteps; every step only depends on steps in earlier levels
+
+    Raises:
+        ValueError: If a step uses an unknown tool, a duplicate id or an unknown
+            step reference, or if the references form a cycle
+    """
+    steps = {}
+    for step in plan.steps:
+        if step.id in steps:
+            raise ValueError(f"Duplicate step id '{step.id}'")
+        if step.tool not in tools_by_name:
+            raise ValueError(f"Step '{step.id}' uses unknown tool '{step.tool}'")
+        steps[step.id] = step
+
+    dependencies = {}
+    for step in plan.steps:
+        dependencies[step.id] = set()
+        for value in step.args.values():
+            if isinstance(value, str) and value.startswith(STEP_REFERENCE):
+                reference = value[len(STEP_REFERENCE):]
+                if reference not in steps:
+                    raise ValueError(f"Step '{step.id}' references unknown step '{value}'")
+                dependencies[step.id].add(reference)
+
+    levels = []
+    done = set()
+    while len(done) < len(steps):
+        ready = [step for step_id, step in steps.items()
+                 if step_id not in done and dependencies[step_id] <= done]
+        if not ready:
+            raise ValueError("Plan steps reference each other in a cycle")
+        levels.append(ready)
+        done.update(step.id for step in ready)
+    return levels
+
+def resolve_args(step, results):
+    """Replace "$<step id>" references with the results of earlier steps"""
+    return {
+        name: results[value[len(STEP_REFERENCE):]]
+        if isinstance(value, str) and value.startswith(STEP_REFERENCE) else value
+        for name, value in step.args.items()
+    }
+
+def run_step(step, results, tools_by_name):
+    """Run one plan step and build its ToolMessage with timing metadata"""
+    args = resolve_args(step, results)
+    start = time.perf_counter()
+    try:
+        observation = tools_by_name[step.tool].invoke(args)
+        error = None
+    except Exception as e:
+        observation, error = None, str(e)
+    duration = time.perf_counter() - start
+    return observation, ToolMessage(
+        content=f"Error: {error}" if error else str(observation),
+        tool_call_id=step.id,
+        name=step.tool,
+        status="error" if error else "success",
+        response_metadata={"args": args, "duration": duration},
+    )
+
+def execute_plan(plan, tools_by_name, executor=None):
+    """Run a plan locally, level by level, with independent steps in parallel.
+
+    Steps that depend on a failed step are skipped.
+
+    Args:
+        plan: The Plan to run
+        tools_by_name: Available tools indexed by name
+        executor: Thread pool for the steps of a level (default: the shared step pool)
+
+    Returns:
+        tuple: (dict of step id -> result, list of ToolMessages in plan order)
+    """
+    levels = plan_levels(plan, tools_by_name)
+    results = {}
+    messages = {}
+    failed = set()
+
+    executor = executor or step_executor
+    for level in levels:
+        runnable = []
+        for step in level:
+            blocked = [value for value in step.args.values()
+                       if isinstance(value, str) and value.startswith(STEP_REFERENCE)
+                       and value[len(STEP_REFERENCE):] in failed]
+            if blocked:
+                failed.add(step.id)
+                messages[step.id] = ToolMessage(
+                    content=f"Skipped: depends on failed step {blocked[0]}",
+                    tool_call_id=step.id, name=step.tool, status="error",
+                )
+            else:
+                runnable.append(step)
+
+        outcomes = executor.map(lambda step: run_step(step, results, tools_by_name), runnable)
+        for step, (observation, message) in zip(runnable, outcomes):
+            messages[step.id] = message
+            if message.status == "error":
+                failed.add(step.id)
+            else:
+                results[step.id] = observation
+
+    return results, [messages[step.id] for step in plan.steps]
+
+def create_plan_execute_agent(llm, tools, respond=True):
+    """Build and compile a plan-and-execute agent.
+
+    One LLM call produces the whole plan as a dependency graph of tool calls,
+    the plan runs locally (independent steps in parallel), and an optional
+    second LLM call phrases the answer. An N-step calculation therefore costs
+    one or two model calls instead of N+1.
+
+    Args:
+        llm: Chat model used for planning and for the final answer
+        tools: Tools the plan may call
+        respond: Phrase the final answer with an LLM call (otherwise the last
+            step result is reported directly)
+
+    Returns:
+        The compiled graph (nodes: planner, executor and optionally responder)
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+    planner_llm = llm.with_structured_output(Plan, method="function_calling")
+    tool_descriptions = "\n".join(f"- {tool.name}{list(tool.args)}: {tool.description.splitlines()[0]}"
+                                  for tool in tools)
+
+    def planner(state: PlanExecuteState):
+        """LLM writes the whole plan in one call"""
+        plan = planner_llm.invoke(
+            [SystemMessage(content=PLANNER_PROMPT.format(tools=tool_descriptions))] + state["messages"]
+        )
+        if not plan.steps:
+            return {"plan": plan, "messages": [AIMessage(content="I could not find any tool steps for this request.")]}
+        tool_calls = [{"name": step.tool, "args": step.args, "id": step.id} for step in plan.steps]
+        return {"plan": plan, "messages": [AIMessage(content="", tool_calls=tool_calls)]}
+
+    def plan_executor(state: PlanExecuteState):
+        """Runs the plan locally"""
+        try:
+            results, messages = execute_plan(state["plan"], tools_by_name)
+        except ValueError as e:
+            return {"results": {}, "messages": [AIMessage(content=f"Invalid plan: {e}")]}
+        return {"results": results, "messages": messages}
+
+    def responder(state: PlanExecuteState):
+        """LLM phrases the final answer from the step results"""
+        query = next(m.content for m in state["messages"] if isinstance(m, HumanMessage))
+        lines = [f"{m.tool_call_id} = {m.name}({m.response_metadata.get('args', '...')}) -> {m.content}"
+                 for m in state["messages"] if isinstance(m, ToolMessage)]
+        response = llm.invoke([
+            SystemMessage(content=RESPONDER_PROMPT),
+            HumanMessage(content=f"Request: {query}\n\nTool steps:\n" + "\n".join(lines)),
+        ])
+        return {"messages": [response]}
+
+    def report(state: PlanExecuteState):
+        """Reports the last step result without another LLM call"""
+        last_step = state["plan"].steps[-1].id if state["plan"] and state["plan"].steps else None
+        if last_step in state["results"]:
+            return {"messages": [AIMessage(content=f"The result is {state['results'][last_step]}.")]}
+        return {"messages": [AIMessage(content="The plan did not produce a result.")]}
+
+    def should_execute(state: PlanExecuteState):
+        """Skip execution when the planner produced no steps"""
+        return "executor" if state["plan"] and state["plan"].steps else END
+
+    def should_respond(state: PlanExecuteState):
+        """Stop when the plan was rejected, otherwise phrase the answer"""
+        if isinstance(state["messages"][-1], AIMessage):
+            return END
+        return "responder"
+
+    agent_builder = StateGraph(PlanExecuteState)
+    agent_builder.add_node("planner", planner)
+    agent_builder.add_node("executor", plan_executor)
+    agent_builder.add_node("responder", responder if respond else report)
+
+    agent_builder.add_edge(START, "planner")
+    agent_builder.add_conditional_edges("planner", should_execute, {"executor": "executor", END: END})
+    agent_builder.add_conditional_edges("executor", should_respond, {"responder": "responder", END: END})
+    agent_builder.add_edge("responder", END)
+
+    return agent_builder.compile()
@@ -0,0 +1,169 @@
+import json
+import time
+from typing import Annotated, Optional, Sequence
+from typing_extensions import NotRequired, TypedDict
+from langchain_core.messages import AIMessage, ToolMessage, BaseMessage
+from langgraph.graph.message import add_messages
+from langgraph.managed import RemainingSteps
+
+# Budget defaults (0 disables a limit)
+DEFAULT_MAX_LLM_CALLS = 10
+DEFAULT_MAX_TOOL_CALLS = 25
+DEFAULT_DEADLINE = 60.0      # Seconds per run
+DEFAULT_MAX_REPEATS = 2      # Identical calls answered from earlier results before the loop is stopped
+
+# Message shown to the user when a run is stopped, per exhaustion reason
+STOP_MESSAGES = {
+    'max_llm_calls': "Stopped before finishing: the run used up its LLM call budget.",
+    'max_tool_calls': "Stopped before finishing: the run used up its tool call budget.",
+    'deadline': "Stopped before finishing: the run exceeded its time budget.",
+    'loop': "Stopped before finishing: the same tool call kept repeating.",
+}
+
+class BudgetState(TypedDict):
+    """Agent state with the per-run budget counters"""
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    remaining_steps: NotRequired[RemainingSteps]
+    llm_calls: NotRequired[int]
+    tool_calls: NotRequired[int]
+    started_at: NotRequired[float]
+    budget_exhausted: NotRequired[Optional[str]]
+
+class RunBudget:
+    """Per-run limits for an agent.
+
+    Args:
+        max_llm_calls: Maximum model calls per run
+        max_tool_calls: Maximum tool executions per run (calls answered from
+            earlier identical calls are free)
+        deadline: Maximum seconds per run
+        max_repeats: How many times an identical tool call (same name and
+            arguments) is answered with its earlier result before the run is stopped
+    """
+
+    __slots__ = ('max_llm_calls', 'max_tool_calls', 'deadline', 'max_repeats')
+
+    def __init__(self, max_llm_calls=DEFAULT_MAX_LLM_CALLS, max_tool_calls=DEFAULT_MAX_TOOL_CALLS,
+                 deadline=DEFAULT_DEADLINE, max_repeats=DEFAULT_MAX_REPEATS):
+        self.max_llm_calls = max_llm_calls
+        self.max_tool_calls = max_tool_calls
+        self.deadline = deadline
+        self.max_repeats = max_repeats
+
+    def __repr__(self):
+        return (f"RunBudget(max_llm_calls={self.max_llm_calls}, max_tool_calls={self.max_tool_calls}, "
+                f"deadline={self.deadline}, max_repeats={self.max_repeats})")
+
+    def key(self):
+        """Hashable form of the limits (for agent cache keys)"""
+        return (self.max_llm_calls, self.max_tool_calls, self.deadline, self.max_repeats)
+
+    def exceeded(self, llm_calls=0, tool_calls=0, started_at=None):
+        """Check the counters against the limits.
+
+        Args:
+            llm_calls: Model calls made so far
+            tool_calls: Tool executions made (or about to be made) so far
+            started_at: time.time() at the start of the run
+
+        Returns:
+            str or None: 'deadline', 'max_llm_calls' or 'max_tool_calls', or None within budget
+        """
+        if self.deadline and started_at is not None and time.time() - started_at >= self.deadline:
+            return 'deadline'
+        if self.max_llm_calls and llm_calls >= self.max_llm_calls:
+            return 'max_llm_calls'
+        if self.max_tool_calls and tool_calls > self.max_tool_calls:
+            return 'max_tool_calls'
+        return None
+
+def tool_call_signature(tool_call):
+    """Identify a tool call by its name and canonical arguments"""
+    return tool_call['name'], json.dumps(tool_call.get('args'), sort_keys=True, default=str)
+
+def split_repeated_calls(messages, tool_calls, max_repeats=DEFAULT_MAX_REPEATS):
+    """Separate new tool calls from repeats of calls that already have a result.
+
+    Args:
+        messages: Conversation so far (excluding the message that holds tool_calls)
+        tool_calls: Tool calls requested by the latest model turn
+        max_repeats: Repeats answered from earlier results before the run counts as looping
+
+    Returns:
+        tuple: (new tool calls, dict of tool_call_id -> earlier result for repeats,
+        True if a call has been repeated more than max_repeats times)
+    """
+    results_by_id = {m.tool_call_id: m.content for m in messages if isinstance(m, ToolMessage)}
+    history = {}  # signature -> [times seen, result]
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                if tool_call.get('id') in results_by_id:
+                    entry = history.setdefault(tool_call_signature(tool_call), [0, None])
+                    entry[0] += 1
+                    entry[1] = results_by_id[tool_call['id']]
+
+    fresh, repeats, looping = [], {}, False
+    for tool_call in tool_calls:
+        entry = history.get(tool_call_signature(tool_call))
+        if entry is None:
+            fresh.append(tool_call)
+        elif entry[0] > max_repeats:
+            looping = True
+        else:
+            repeats[tool_call['id']] = entry[1]
+            entry[0] += 1
+    return fresh, repeats, looping
+
+def make_budget_hooks(budget=None, pre_model_hook=None):
+    """Build pre/post model hooks that enforce a RunBudget in create_react_agent.
+
+    Use them with state_schema=BudgetState. After each model call, the post
+    hook counts the call and the requested tool calls. Repeated identical
+    calls are answered with their earlier result instead of being executed.
+    When a limit is hit, the pending tool calls are replaced by a final stop
+    message, and the reason is stored in state['budget_exhausted'].
+
+    Args:
+        budget: RunBudget to enforce (default: RunBudget())
+        pre_model_hook: Optional pre-model hook to run as well (e.g. history compaction)
+
+    Returns:
+        tuple: (pre_model_hook, post_model_hook)
+    """
+    budget = budget or RunBudget()
+
+    def budget_pre_hook(state):
+        update = pre_model_hook(state) if pre_model_hook else {"llm_input_messages": state["messages"]}
+        if state.get("started_at") is None:
+            update = dict(update, started_at=time.time())
+        return update
+
+    def budget_post_hook(state):
+        messages = state["messages"]
+        ai_message = messages[-1]
+        llm_calls = state.get("llm_calls", 0) + 1
+        update = {"llm_calls": llm_calls}
+        if not isinstance(ai_message, AIMessage) or not ai_message.tool_calls:
+            return update
+
+        fresh, repeats, looping = split_repeated_calls(messages[:-1], ai_message.tool_calls, budget.max_repeats)
+        tool_calls = state.get("tool_calls", 0) + len(fresh)
+        reason = 'loop' if looping else budget.exceeded(llm_calls, tool_calls, state.get("started_at"))
+        if reason:
+            # Same id: replaces the tool-calling message, which ends the run
+            update["messages"] = [AIMessage(content=STOP_MESSAGES[reason], id=ai_message.id)]
+            update["budget_exhausted"] = reason
+            return update
+
+        update["tool_calls"] = tool_calls
+        if repeats:
+            names = {tool_call['id']: tool_call['name'] for tool_call in ai_message.tool_calls}
+            update["messages"] = [
+                ToolMessage(content=result, tool_call_id=call_id, name=names[call_id],
+                            response_metadata={"repeated": True})
+                for call_id, result in repeats.items()
+            ]
+        return update
+
+    return budget_pre_hook, budget_post_hook
@@ -0,0 +1,118 @@
+import time
+import hashlib
+import threading
+
+def llm_config_key(llm):
+    """Identify a chat model configuration (class, model, endpoint, temperature)"""
+    return (
+        type(llm).__name__,
+        getattr(llm, 'model_name', None) or getattr(llm, 'model', None),
+        str(getattr(llm, 'openai_api_base', None) or getattr(llm, 'base_url', None)),
+        getattr(llm, 'temperature', None),
+    )
+
+def agent_cache_key(llm, tools, prompt=None, **options):
+    """Build the cache key for an agent.
+
+    Args:
+        llm: Chat model the agent uses
+        tools: Tools bound to the agent
+        prompt: System prompt text
+        **options: Any other settings that change the compiled graph
+
+    Returns:
+        tuple: Hashable key (model config, tool names, prompt hash, options)
+    """
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest() if prompt else None
+    return (
+        llm_config_key(llm),
+        tuple(tool.name for tool in tools),
+        prompt_hash,
+        tuple(sorted(options.items())),
+    )
+
+class AgentCache:
+    """Thread-safe cache of compiled agent graphs.
+
+    Compiled LangGraph graphs hold no per-run state, so one instance can serve
+    every request and thread. Each key is built once; concurrent requests for a
+    key that is still compiling wait for that build instead of starting another.
+    """
+
+    def __init__(self):
+        self._agents = {}
+        self._building = {}  # key -> lock held while the agent compiles
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'build_seconds': 0.0}
+
+    def get(self, key, factory):
+        """Get the agent for key, building it with factory() on first use.
+
+        Args:
+            key: Hashable cache key (see agent_cache_key)
+            factory: Zero-argument callable that builds and compiles the agent
+
+        Returns:
+            The compiled agent
+        """
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._stats['hits'] += 1
+                return agent
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                agent = self._agents.get(key)
+                if agent is not None:
+                    self._stats['hits'] += 1
+                    return agent
+
+            start = time.perf_counter()
+            agent = factory()
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._agents[key] = agent
+                self._building.pop(key, None)
+                self._stats['misses'] += 1
+                self._stats['build_seconds'] += elapsed
+            return agent
+
+    def warm_up(self, *factories):
+        """Build agents ahead of time, e.g. at process start.
+
+        Args:
+            *factories: Zero-argument callables that go through the cache
+                (e.g. lambda: create_calculator_agent("basic"))
+
+        Returns:
+            float: Seconds spent warming up
+        """
+        start = time.perf_counter()
+        for factory in factories:
+            factory()
+        return time.perf_counter() - start
+
+    def clear(self):
+        """Drop every cached agent"""
+        with self._lock:
+            self._agents.clear()
+
+    def stats(self):
+        """Get hit/miss counters and the total time spent compiling"""
+        with self._lock:
+            return dict(self._stats, agents=len(self._agents))
+
+_agent_cache = None
+_agent_cache_lock = threading.Lock()
+
+def get_agent_cache():
+    """Get the process-wide agent cache"""
+    global _agent_cache
+    if _agent_cache is None:
+        with _agent_cache_lock:
+            if _agent_cache is None:
+                _agent_cache = AgentCache()
+    return _agent_cache
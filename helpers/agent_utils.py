@@ -1,71 +1,331 @@
+import asyncio
+import threading
 import time
 import re
 import ast
-import operator
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langgraph.prebuilt import create_react_agent
-from .llm_config import configure_llm
+from .llm_config import configure_llm, aconfigure_llm
 from .calculator_tools import get_calculator_tools
+from .expression_eval import evaluate_bounded
+from .tool_tracker import ToolTracker, PrintSink, current_tracker
+from .llm_cache import cache_bypass
+from .calculation_result import (
+    CalculationRun, CalculationResult, append_results_file,
+    DEFAULT_CONFIDENCE, DEFAULT_MAX_FAILURE_RATE, runs_for_confidence, adaptive_stop,
+)
+from .agent_cache import get_agent_cache, agent_cache_key
+from .message_compaction import make_compaction_hook, DEFAULT_KEEP_TURNS, DEFAULT_MAX_TOKENS
+from .agent_budget import RunBudget, BudgetState, make_budget_hooks
 
-def create_calculator_agent():
-    """Create a ReAct agent with calculator tools"""
+def create_calculator_agent(tool_set="basic", use_cache=True, keep_turns=DEFAULT_KEEP_TURNS,
+                            max_prompt_tokens=DEFAULT_MAX_TOKENS, budget=None, memoize_tools=False):
+    """Create a ReAct agent with calculator tools
+    
+    The compiled agent is cached per (model config, tool set, prompt), so
+    repeated calls return the same graph instead of recompiling it. Before each
+    model call the history is compacted (see helpers.message_compaction): older
+    tool calls are sent as a one-line-per-call scratchpad, so long chains don't
+    resend every earlier message.
+    
+    Args:
+        tool_set: Calculator tool set to bind (see get_calculator_tools); pass
+            "expression" or "all" to let the model evaluate a whole expression
+            in one call
+        use_cache: Reuse a previously compiled agent (False always builds a new one)
+        keep_turns: Most recent model turns sent verbatim (0 disables compaction)
+        max_prompt_tokens: Token budget for the compacted history (0 = no budget)
+        budget: RunBudget with the per-run LLM call, tool call, deadline and
+            repeated-call limits (default: RunBudget())
+        memoize_tools: Answer identical calculator calls from the shared tool
+            memo cache, across runs (see helpers.tool_memo)
+    """
+    budget = budget or RunBudget()
     llm = configure_llm()
-    tools = get_calculator_tools()
-    
-    # Create the ReAct agent with calculator tools and system prompt
-    agent = create_react_agent(
-        llm, 
-        tools,
-        prompt="""You are a helpful calculator assistant. When asked to perform mathematical calculations, 
-        you should use the provided calculator tools (add, subtract, multiply, divide) to compute the results accurately.
+    tools = get_calculator_tools(tool_set, memoize=memoize_tools)
+    tool_names = ", ".join(tool.name for tool in tools)
+    
+    prompt = f"""You are a helpful calculator assistant. When asked to perform mathematical calculations, 
+        you should use the provided calculator tools ({tool_names}) to compute the results accurately.
         Always use the tools for calculations rather than doing math in your head."""
-    )
+    if any(tool.name == "evaluate_expression" for tool in tools):
+        prompt += """
+        When the whole calculation can be written as one expression, call evaluate_expression once
+        with the complete expression instead of computing it step by step."""
+    
+    def build():
+        # Create the ReAct agent with calculator tools and system prompt
+        pre_model_hook, post_model_hook = make_budget_hooks(
+            budget,
+            make_compaction_hook(keep_turns, max_prompt_tokens) if keep_turns else None
+        )
+        return create_react_agent(
+            llm, 
+            tools,
+            prompt=prompt,
+            state_schema=BudgetState,
+            pre_model_hook=pre_model_hook,
+            post_model_hook=post_model_hook
+        )
+    
+    if not use_cache:
+        return build()
+    key = agent_cache_key(llm, tools, prompt, keep_turns=keep_turns, max_prompt_tokens=max_prompt_tokens,
+                          budget=budget.key(), memoize_tools=memoize_tools)
+    return get_agent_cache().get(key, build)
+
+def warm_up_calculator_agents(tool_sets=("basic",)):
+    """Compile calculator agents ahead of time (e.g. at process start).
+    
+    Args:
+        tool_sets: Tool sets to compile agents for
+        
+    Returns:
+        float: Seconds spent compiling
+    """
+    return get_agent_cache().warm_up(*(lambda tool_set=tool_set: create_calculator_agent(tool_set)
+                                       for tool_set in tool_sets))
+
+async def acreate_calculator_agent(tool_set="basic", use_cache=True, **kwargs):
+    """Async version of create_calculator_agent.
     
-    return agent
+    Graph construction and compilation run in a worker thread so they don't
+    block the event loop.
+    """
+    return await asyncio.to_thread(create_calculator_agent, tool_set, use_cache, **kwargs)
+
+# One-pass answer scanner: number | cue before an answer | word naming the answer |
+# hedge word (keeps the cue) | sentence end | any other word (clears the cue)
+_ANSWER_SCANNER = re.compile(
+    r'(?P<number>(?:(?<![\w)])[+-])?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]\d))'
+    r'|(?P<cue>==?|→|≈|:|\b(?:is|are|equals?|equal\s+to|gives|giving|was|comes\s+to)\b)'
+    r'|(?P<answer>\b(?:answer|result|total)s?\b)'
+    r'|(?P<hedge>\b(?:approximately|about|around|roughly|exactly|just|the|a|then)\b)'
+    r'|(?P<end>[.!?](?=\s|$)|\n)'
+    r'|(?P<word>[^\W\d_]+)',
+    re.IGNORECASE,
+)
+
+class NumberCandidate:
+    """A number found in an answer.
+
+    Attributes:
+        value: The parsed number
+        start, end: Position of the number in the text
+        sentence: Index of the sentence it appears in
+        cue: The cue right before it ("is", "=", ":", ...), or None
+        answer_cue: Whether it is the first cued number after "answer"/"result"/"total"
+            in its sentence (e.g. "The result of 15 + 25 is 40")
+        last_in_sentence: Whether no other number follows it in its sentence
+    """
+
+    __slots__ = ('value', 'start', 'end', 'sentence', 'cue', 'answer_cue', 'last_in_sentence')
+
+    def __init__(self, value, start, end, sentence, cue=None, answer_cue=False):
+        self.value = value
+        self.start = start
+        self.end = end
+        self.sentence = sentence
+        self.cue = cue
+        self.answer_cue = answer_cue
+        self.last_in_sentence = True
+
+    def __repr__(self):
+        return f"NumberCandidate({self.value}, start={self.start}, cue={self.cue!r}, answer_cue={self.answer_cue})"
 
-def extract_numerical_result(final_answer):
+def scan_numbers(text):
+    """Find every number in a text, with its position and the cue before it, in one pass.
+    
+    Args:
+        text: Answer text to scan
+        
+    Returns:
+        list: NumberCandidates in text order
+    """
+    candidates = []
+    sentence = 0
+    cue = None
+    answer_pending = False  # "answer"/"result" seen in this sentence, its number not yet found
+    for match in _ANSWER_SCANNER.finditer(text or ""):
+        kind = match.lastgroup
+        if kind == 'number':
+            if candidates and candidates[-1].sentence == sentence:
+                candidates[-1].last_in_sentence = False
+            answer_cue = bool(cue) and answer_pending
+            candidates.append(NumberCandidate(
+                float(match.group().replace(',', '')), match.start(), match.end(), sentence, cue, answer_cue))
+            answer_pending = answer_pending and not answer_cue
+            cue = None
+        elif kind == 'cue':
+            cue = match.group().lower()
+        elif kind == 'answer':
+            answer_pending = True
+        elif kind == 'end':
+            sentence += 1
+            cue = None
+            answer_pending = False
+        elif kind == 'word':
+            cue = None
+    return candidates
+
+def choose_answer(candidates):
+    """Pick the number most likely to be the answer.
+    
+    Rules, in order: the last number introduced as the answer/result ("the
+    result is 40"), the last cued number ("= 40", "is 40"), the last number of
+    the last sentence that contains one.
+    
+    Args:
+        candidates: NumberCandidates from scan_numbers
+        
+    Returns:
+        NumberCandidate or None
+    """
+    if not candidates:
+        return None
+    for rule in (lambda c: c.answer_cue, lambda c: c.cue):
+        chosen = next((c for c in reversed(candidates) if rule(c)), None)
+        if chosen is not None:
+            return chosen
+    return candidates[-1]
+
+def _tool_value(tool_result):
+    """A tool result as a float, or None if it is not numeric"""
+    if isinstance(tool_result, bool):
+        return None
+    try:
+        return float(tool_result)
+    except (TypeError, ValueError):
+        return None
+
+def _matches_rounded(number, text, value):
+    """Whether value rounds to a number written in the text (e.g. 3.14159 -> "3.14")"""
+    literal = text[number.start:number.end].lower()
+    decimals = len(literal.split('.')[1].split('e')[0]) if '.' in literal and 'e' not in literal else 0
+    return abs(number.value - value) <= 0.5 * 10 ** -decimals + 1e-9 * max(1.0, abs(value))
+
+def extract_numerical_result(final_answer, tool_result=None):
     """Extract numerical result from the final answer text.
     
+    The answer is scanned once for every number (see scan_numbers) and the
+    answer is picked by rule (see choose_answer). When the last tool result is
+    given and the text states it (possibly rounded), the tool's exact value is
+    returned; a text that states something else wins, so transcription errors
+    still show up in validation.
+    
     Args:
         final_answer: String containing the final answer from the agent
+        tool_result: Optional last tool result of the run (e.g. ToolTracker.last_result)
         
     Returns:
         float or None: The extracted numerical value, or None if not found
     """
-    if not final_answer:
-        return None
-    
-    # Look for patterns like "is 123", "equals 456.78", "result is 789"
-    patterns = [
-        r'(?:is|equals?|result(?:\s+is)?)\s+(?:approximately\s+)?([+-]?\d+(?:\.\d+)?)',
-        r'([+-]?\d+(?:\.\d+)?)\s*(?:square\s+units)?\.?\s*$',  # For area calculations
-        r'→\s*([+-]?\d+(?:\.\d+)?)',  # For tool results
-        r'([+-]?\d+(?:\.\d+))',  # Any number in the text
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, final_answer, re.IGNORECASE)
-        if match:
-            try:
-                return float(match.group(1))
-            except (ValueError, IndexError):
-                continue
+    tool_value = _tool_value(tool_result)
+    candidates = scan_numbers(final_answer)
+    if not candidates:
+        return tool_value if final_answer else None
     
-    return None
+    chosen = choose_answer(candidates)
+    if tool_value is not None and _matches_rounded(chosen, final_answer, tool_value):
+        return tool_value
+    return chosen.value
 
-def extract_expression_with_llm(query):
-    """Extract mathematical expression from query using LLM.
+# Number pattern used by the local expression extractor
+_NUMBER = r'-?\d+(?:\.\d+)?'
+
+# Word forms rewritten to Python operators, applied in order to the lowercased query
+_EXPRESSION_REWRITES = [
+    (re.compile(rf'\bsubtract\s+({_NUMBER})\s+from\s+({_NUMBER})'), r'(\2 - \1)'),
+    (re.compile(rf'\badd\s+({_NUMBER})\s+(?:and|to)\s+({_NUMBER})'), r'(\1 + \2)'),
+    (re.compile(rf'\bmultiply\s+({_NUMBER})\s+(?:by|and|with)\s+({_NUMBER})'), r'(\1 * \2)'),
+    (re.compile(rf'\bdivide\s+({_NUMBER})\s+by\s+({_NUMBER})'), r'(\1 / \2)'),
+    (re.compile(rf'\b(?:the\s+)?sum\s+of\s+({_NUMBER})\s+and\s+({_NUMBER})'), r'(\1 + \2)'),
+    (re.compile(rf'\b(?:the\s+)?product\s+of\s+({_NUMBER})\s+and\s+({_NUMBER})'), r'(\1 * \2)'),
+    (re.compile(rf'\b(?:the\s+)?difference\s+(?:between|of)\s+({_NUMBER})\s+and\s+({_NUMBER})'), r'(\1 - \2)'),
+    (re.compile(rf'\b(?:the\s+)?quotient\s+of\s+({_NUMBER})\s+and\s+({_NUMBER})'), r'(\1 / \2)'),
+    (re.compile(r'\b(?:to\s+the\s+power\s+of|raised\s+to(?:\s+the\s+power\s+of)?)\b|\^'), ' ** '),
+    (re.compile(r'\b(?:multiplied\s+by|times)\b|(?<=\d)\s*x\s*(?=[\d(])|×'), ' * '),
+    (re.compile(r'\b(?:divided\s+by|over)\b|÷'), ' / '),
+    (re.compile(r'\b(?:plus|added\s+to)\b'), ' + '),
+    (re.compile(r'\bminus\b'), ' - '),
+    (re.compile(r'\b(?:mod|modulo)\b'), ' % '),
+    (re.compile(r'\bsquared\b'), ' ** 2'),
+    (re.compile(r'\bcubed\b'), ' ** 3'),
+]
+
+# Tokens: number | operator or parenthesis | anything else (words, punctuation)
+_EXPRESSION_TOKEN = re.compile(r'(\d+(?:\.\d+)?|\.\d+)|(\*\*|//|[-+*/%()])|([^\s\d+\-*/%()]+)')
+
+# Counters for which extraction path was taken (see get_extraction_stats)
+_extraction_stats = {'local': 0, 'llm': 0, 'failed': 0}
+_extraction_stats_lock = threading.Lock()
+
+def extract_expression_locally(query):
+    """Extract a mathematical expression from a query without calling the LLM.
+    
+    Handles symbolic expressions ("145 + 237", "((15 + 25) * 3)/(43 - 12*5)") and
+    common word forms ("1024 divided by 8", "23 times 67", "subtract 89 from 234").
+    The result is only returned when it is unambiguous: every number in the query
+    must belong to one contiguous expression that parses as valid arithmetic.
     
     Args:
         query: The user's calculation query
         
     Returns:
-        str or None: The extracted mathematical expression, or None if not found
+        str or None: The extracted expression, or None if the local parser is not confident
     """
+    if not query:
+        return None
+    
+    text = query.lower()
+    for pattern, replacement in _EXPRESSION_REWRITES:
+        text = pattern.sub(replacement, text)
+    
+    # Split the token stream into contiguous runs of math tokens
+    spans = [[]]
+    for match in _EXPRESSION_TOKEN.finditer(text):
+        number, operator_token, word = match.groups()
+        if word is not None:
+            if spans[-1]:
+                spans.append([])
+        else:
+            spans[-1].append((number, operator_token))
+    
+    numeric_spans = [span for span in spans if any(number for number, _ in span)]
+    if len(numeric_spans) != 1:
+        return None  # No numbers, or numbers scattered across the sentence
+    
+    span = numeric_spans[0]
+    if not any(op in ('+', '-', '*', '/', '**', '//', '%') for _, op in span if op):
+        return None
+    
+    # Join tokens with spaces, attaching parentheses and unary minus to their operand
+    parts = []
+    attach = False
+    previous = None
+    for number, op in span:
+        token = number or op
+        if parts and (attach or token == ')'):
+            parts[-1] += token
+        else:
+            parts.append(token)
+        attach = token == '(' or (token == '-' and (previous is None or previous in ('(', '+', '-', '*', '/', '**', '//', '%')))
+        previous = token
+    expression = ' '.join(parts)
     try:
-        llm = configure_llm()
-        
-        extraction_prompt = f"""Extract the mathematical expression from this query and return ONLY the mathematical expression that can be evaluated with Python's eval() function.
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        return None
+    if not isinstance(tree.body, (ast.BinOp, ast.UnaryOp)):
+        return None
+    # Drop the grouping a phrase rewrite adds when it is the whole expression ("(4 + 5)")
+    if expression.startswith('(') and expression.endswith(')') and '(' not in expression[1:] and ')' not in expression[:-1]:
+        expression = expression[1:-1]
+    return expression
+
+def _build_extraction_prompt(query):
+    """Build the prompt used to extract a mathematical expression from a query"""
+    return f"""Extract the mathematical expression from this query and return ONLY the mathematical expression that can be evaluated with Python's eval() function.
 
 Query: "{query}"
 
@@ -77,31 +337,126 @@ Rules:
 - If no clear mathematical expression exists, return "NONE"
 
 Mathematical expression:"""
+
+def _clean_extracted_expression(content):
+    """Clean up the LLM extraction response, returning None if it is not an expression"""
+    expression = content.strip()
+    
+    # Clean up the response
+    if "NONE" in expression.upper() or not expression:
+        return None
         
-        response = llm.invoke([HumanMessage(content=extraction_prompt)])
-        expression = response.content.strip()
+    # Remove any quotes or extra formatting
+    expression = expression.strip('"\'`')
+    
+    # Basic validation - check if it looks like a math expression
+    if any(op in expression for op in ['+', '-', '*', '/', '(', ')']):
+        return expression
+    
+    return None
+
+def extract_expression_with_llm(query, quiet=False):
+    """Extract mathematical expression from query using LLM.
+    
+    Args:
+        query: The user's calculation query
+        quiet: Suppress the warning printed when extraction fails
         
-        # Clean up the response
-        if "NONE" in expression.upper() or not expression:
-            return None
-            
-        # Remove any quotes or extra formatting
-        expression = expression.strip('"\'`')
+    Returns:
+        str or None: The extracted mathematical expression, or None if not found
+    """
+    try:
+        llm = configure_llm()
+        response = llm.invoke([HumanMessage(content=_build_extraction_prompt(query))])
+        return _clean_extracted_expression(response.content)
+    except Exception as e:
+        if not quiet:
+            print(f"⚠️  Warning: Failed to extract expression with LLM: {e}")
+    
+    return None
+
+async def aextract_expression_with_llm(query, quiet=False):
+    """Async version of extract_expression_with_llm.
+    
+    Args:
+        query: The user's calculation query
+        quiet: Suppress the warning printed when extraction fails
         
-        # Basic validation - check if it looks like a math expression
-        if any(op in expression for op in ['+', '-', '*', '/', '(', ')']):
-            return expression
-            
+    Returns:
+        str or None: The extracted mathematical expression, or None if not found
+    """
+    try:
+        llm = await aconfigure_llm()
+        response = await llm.ainvoke([HumanMessage(content=_build_extraction_prompt(query))])
+        return _clean_extracted_expression(response.content)
     except Exception as e:
-        print(f"⚠️  Warning: Failed to extract expression with LLM: {e}")
+        if not quiet:
+            print(f"⚠️  Warning: Failed to extract expression with LLM: {e}")
     
     return None
 
-def safe_eval_expression(expression):
-    """Safely evaluate mathematical expression using Python's eval.
+def _record_extraction(source):
+    with _extraction_stats_lock:
+        _extraction_stats[source or 'failed'] += 1
+
+def extract_expression(query, quiet=False):
+    """Extract a mathematical expression, trying the local parser before the LLM.
+    
+    Args:
+        query: The user's calculation query
+        quiet: Suppress warnings from the LLM fallback
+        
+    Returns:
+        tuple: (expression or None, source) where source is 'local', 'llm' or None
+    """
+    expression = extract_expression_locally(query)
+    source = 'local'
+    if expression is None:
+        expression = extract_expression_with_llm(query, quiet=quiet)
+        source = 'llm' if expression else None
+    _record_extraction(source)
+    return expression, source
+
+async def aextract_expression(query, quiet=False):
+    """Async version of extract_expression.
+    
+    Args:
+        query: The user's calculation query
+        quiet: Suppress warnings from the LLM fallback
+        
+    Returns:
+        tuple: (expression or None, source) where source is 'local', 'llm' or None
+    """
+    expression = extract_expression_locally(query)
+    source = 'local'
+    if expression is None:
+        expression = await aextract_expression_with_llm(query, quiet=quiet)
+        source = 'llm' if expression else None
+    _record_extraction(source)
+    return expression, source
+
+def get_extraction_stats():
+    """Get counts of which extraction path was taken.
+    
+    Returns:
+        dict: Counts for 'local', 'llm' and 'failed', plus the local 'hit_rate'
+    """
+    with _extraction_stats_lock:
+        stats = dict(_extraction_stats)
+    total = sum(stats.values())
+    stats['hit_rate'] = stats['local'] / total if total else 0.0
+    return stats
+
+def safe_eval_expression(expression, quiet=False):
+    """Safely evaluate a mathematical expression.
+    
+    The expression is validated and compiled to a stack program once; repeated
+    expressions reuse the cached program (see helpers.expression_eval). Huge
+    powers such as "9 ** 9 ** 9" are bounded instead of stalling the caller.
     
     Args:
         expression: Mathematical expression string
+        quiet: Suppress the warning printed when evaluation fails
         
     Returns:
         float or None: The calculated result, or None if evaluation failed
@@ -109,334 +464,466 @@ def safe_eval_expression(expression):
     if not expression:
         return None
     
-    try:
-        # Define safe operators
-        safe_ops = {
-            ast.Add: operator.add,
-            ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
-            ast.Div: operator.truediv,
-            ast.Pow: operator.pow,
-            ast.Mod: operator.mod,
-            ast.FloorDiv: operator.floordiv,
-            ast.USub: operator.neg,
-            ast.UAdd: operator.pos,
-        }
-        
-        def safe_eval_node(node):
-            if isinstance(node, ast.Constant):  # Numbers (Python 3.8+)
-                return node.value
-            elif hasattr(ast, 'Num') and isinstance(node, ast.Num):  # Python < 3.8 compatibility
-                return node.n
-            elif isinstance(node, ast.BinOp):  # Binary operations
-                left = safe_eval_node(node.left)
-                right = safe_eval_node(node.right)
-                op = safe_ops.get(type(node.op))
-                if op:
-                    return op(left, right)
-                else:
-                    raise ValueError(f"Unsupported operation: {type(node.op)}")
-            elif isinstance(node, ast.UnaryOp):  # Unary operations
-                operand = safe_eval_node(node.operand)
-                op = safe_ops.get(type(node.op))
-                if op:
-                    return op(operand)
-                else:
-                    raise ValueError(f"Unsupported unary operation: {type(node.op)}")
-            else:
-                raise ValueError(f"Unsupported node type: {type(node)}")
-        
-        # Parse and evaluate
-        tree = ast.parse(expression, mode='eval')
-        result = safe_eval_node(tree.body)
-        return float(result)
-        
-    except Exception as e:
-        print(f"⚠️  Warning: Failed to evaluate expression '{expression}': {e}")
-        return None
+    result = evaluate_bounded(expression)
+    if quiet:
+        pass
+    elif result.status == 'too_expensive':
+        print(f"⚠️  Warning: Expression '{expression}' is too expensive to evaluate: {result.reason}")
+    elif not result.ok:
+        print(f"⚠️  Warning: Failed to evaluate expression '{expression}': {result.reason}")
+    return result.value
 
 def print_tool_execution_details(chunk, tool_tracker=None):
-    """Print detailed information about tool execution"""
-    if tool_tracker is None:
-        tool_tracker = {'calls': [], 'results': [], 'pending_calls': {}, 'last_result': None}
-    
-    for node, data in chunk.items():
-        if 'messages' in data:
-            for message in data['messages']:
-                if hasattr(message, 'tool_calls') and message.tool_calls:
-                    for tool_call in message.tool_calls:
-                        call_id = tool_call.get('id', f"{tool_call['name']}_{len(tool_tracker['calls'])}")
-                        tool_tracker['calls'].append(tool_call)
-                        tool_tracker['pending_calls'][call_id] = tool_call
-                
-                elif hasattr(message, 'invalid_tool_calls') and message.invalid_tool_calls:
-                    print(f"\n❌ Invalid Tool Calls from {node}:")
-                    for invalid_call in message.invalid_tool_calls:
-                        print(f"   🚫 {invalid_call['name']}: {invalid_call.get('error', 'Invalid format')}")
-                
-                elif isinstance(message, ToolMessage):
-                    result_info = {'name': message.name, 'content': message.content, 'tool_call_id': message.tool_call_id}
-                    tool_tracker['results'].append(result_info)
-                    
-                    # Find the corresponding tool call and print the combined format
-                    matching_call = None
-                    if message.tool_call_id in tool_tracker['pending_calls']:
-                        matching_call = tool_tracker['pending_calls'][message.tool_call_id]
-                        del tool_tracker['pending_calls'][message.tool_call_id]
-                    else:
-                        # Fallback: find by name
-                        for call_id, call in list(tool_tracker['pending_calls'].items()):
-                            if call['name'] == message.name:
-                                matching_call = call
-                                del tool_tracker['pending_calls'][call_id]
-                                break
-                    
-                    if matching_call:
-                        print(f"🛠️  {matching_call['name']}({matching_call['args']}) -> {message.content}")
-                    else:
-                        print(f"🛠️  {message.name}(...) -> {message.content}")
-                    
-                    # Store the last result as potential final value
-                    tool_tracker['last_result'] = message.content
-                
-                elif isinstance(message, AIMessage) and message.content and not hasattr(message, 'tool_calls'):
-                    print(f"\n🤖 AI Response from {node}:")
-                    print(f"   💭 {message.content}")
+    """Print detailed information about tool execution.
+    
+    Args:
+        chunk: A chunk streamed from the agent
+        tool_tracker: ToolTracker to record into (default: a new tracker that prints)
     
+    Returns:
+        ToolTracker: The tracker, for passing to the next call
+    """
+    if tool_tracker is None:
+        tool_tracker = ToolTracker(sinks=[PrintSink()])
+    tool_tracker.track_chunk(chunk)
     return tool_tracker
 
 def print_final_result(tool_tracker):
     """Print the final calculation result if available"""
-    if 'last_result' in tool_tracker and tool_tracker['last_result'] is not None:
-        print(f"🎯 result = {tool_tracker['last_result']}")
+    if tool_tracker.last_result is not None:
+        print(f"🎯 result = {tool_tracker.last_result}")
+    if tool_tracker.memo_hits:
+        lookups = tool_tracker.memo_hits + tool_tracker.memo_misses
+        print(f"♻️  Memoized tool results: {tool_tracker.memo_hits}/{lookups}")
 
 def print_tool_summary(tool_tracker):
     """Print a nice summary of all tool calls and their results"""
-    if not tool_tracker['calls'] and not tool_tracker['results']:
+    records = tool_tracker.calls + tool_tracker.orphan_results
+    if not records:
         return
     
-    # Create a mapping of calls to results
-    call_result_pairs = []
-    
-    # Try to match calls with results
-    calls_used = set()
-    for result in tool_tracker['results']:
-        # Find matching call by name (simple approach for summary)
-        for i, call in enumerate(tool_tracker['calls']):
-            if i not in calls_used and call['name'] == result['name']:
-                call_result_pairs.append((call, result))
-                calls_used.add(i)
-                break
-    
-    # Print the matched pairs
-    if call_result_pairs:
-        for call, result in call_result_pairs:
-            print(f"🛠️  {call['name']}({call['args']}) -> {result['content']}")
-    
-    # Print any remaining calls without results
-    for i, call in enumerate(tool_tracker['calls']):
-        if i not in calls_used:
-            print(f"🛠️  {call['name']}({call['args']}) -> [pending]")
+    for record in records:
+        if record.pending:
+            print(f"🛠️  {record.name}({record.args}) -> [pending]")
+        elif record.args is None:
+            print(f"🛠️  {record.name}(...) -> {record.result}")
+        else:
+            print(f"🛠️  {record.name}({record.args}) -> {record.result}")
     
     # Print final result
-    if 'last_result' in tool_tracker and tool_tracker['last_result'] is not None:
-        print(f"🎯 result = {tool_tracker['last_result']}")
+    print_final_result(tool_tracker)
 
-def run_calculation(agent, query, repeat=1):
-    """Run a calculation query and show detailed execution with optional validation.
+def _new_run_state(verbose=False):
+    """Create the mutable state collected while streaming a single run.
     
     Args:
-        agent: The calculator agent to use
-        query: The calculation query string
-        repeat: Number of times to run the calculation for validation (default=1)
+        verbose: Whether the tool tracker prints each result as it arrives
+    """
+    return {
+        'result': None,
+        'successful_calculation': False,
+        'final_answer': None,
+        'budget_exhausted': None,
+        'tool_tracker': ToolTracker(sinks=[PrintSink()] if verbose else None),
+        # Chunk timing: each streamed update arrives when its node finishes
+        'started_at': time.perf_counter(),
+        'last_chunk_at': None,
+        'first_chunk_at': None,
+        'node_times': {},
+    }
+
+def _process_chunk(chunk, run_state):
+    """Track tool calls and the final answer for one streamed chunk.
     
-    Returns:
-        The result from the last execution
+    Args:
+        chunk: A chunk streamed from the agent
+        run_state: State dict created by _new_run_state
     """
-    if repeat < 1:
-        repeat = 1
+    # Attribute the time since the previous chunk to the node(s) that produced this one
+    now = time.perf_counter()
+    # Time to first chunk is measured to the model's first output: hook nodes
+    # (e.g. pre_model_hook) stream an update before the model has been called
+    if run_state['first_chunk_at'] is None and 'agent' in chunk:
+        run_state['first_chunk_at'] = now
+    elapsed = now - (run_state['last_chunk_at'] or run_state['started_at'])
+    run_state['last_chunk_at'] = now
+    for node in chunk:
+        run_state['node_times'][node] = run_state['node_times'].get(node, 0.0) + elapsed / len(chunk)
     
-    # Extract expression and calculate ground truth for validation
-    extracted_expression = extract_expression_with_llm(query)
-    ground_truth = safe_eval_expression(extracted_expression) if extracted_expression else None
+    run_state['tool_tracker'].track_chunk(chunk)
+    # Hook nodes that only update counters don't replace the last message chunk
+    if any(data and 'messages' in data for data in chunk.values()):
+        run_state['result'] = chunk
+    
+    # Check for successful tool execution
+    if 'agent' in chunk and 'messages' in chunk['agent']:
+        for message in chunk['agent']['messages']:
+            if isinstance(message, ToolMessage):
+                run_state['successful_calculation'] = True
+                run_state['final_answer'] = message.content
+            elif isinstance(message, AIMessage) and message.content:
+                run_state['final_answer'] = message.content
+    
+    # A run stopped by its budget ends with the stop message
+    hook_update = chunk.get('post_model_hook')
+    if hook_update and hook_update.get('budget_exhausted'):
+        run_state['budget_exhausted'] = hook_update['budget_exhausted']
+        run_state['final_answer'] = hook_update['messages'][-1].content
+
+def _run_timings(run_state, execution_time):
+    """Split a run's wall time into time to first chunk, LLM, tool and overhead time
     
+    Node durations are measured between streamed chunks, so framework time
+    spent around a node is attributed to it; the overhead is what is left
+    (hooks, graph scheduling and streaming).
+    """
+    node_times = run_state['node_times']
+    llm_time = node_times.get('agent', 0.0)
+    tool_time = node_times.get('tools', 0.0)
+    first_chunk_at = run_state['first_chunk_at']
+    return {
+        'time_to_first_chunk': first_chunk_at - run_state['started_at'] if first_chunk_at else None,
+        'llm': llm_time,
+        'tools': tool_time,
+        'overhead': max(execution_time - llm_time - tool_time, 0.0),
+        'nodes': dict(node_times),
+    }
+
+def _finish_run(run_state, run_number, execution_time):
+    """Build the CalculationRun for a completed run"""
+    tool_tracker = run_state['tool_tracker']
+    return CalculationRun(
+        run_number=run_number,
+        final_answer=run_state['final_answer'],
+        # Extract numerical result for validation
+        value=extract_numerical_result(run_state['final_answer'], tool_tracker.last_result),
+        successful_calculation=run_state['successful_calculation'],
+        tools_used=tool_tracker.tools_used,
+        tool_calls=[record.to_dict() for record in tool_tracker.calls + tool_tracker.orphan_results],
+        execution_time=execution_time,
+        budget_exhausted=run_state['budget_exhausted'],
+        timings=_run_timings(run_state, execution_time),
+        last_chunk=run_state['result'],
+        tool_tracker=tool_tracker,
+    )
+
+def _print_run_header(query, run_num, repeat):
+    """Print the banner shown before each run"""
+    if repeat > 1:
+        print(f"\n{'='*60}")
+        print(f"🧮 QUERY (Run {run_num + 1}/{repeat}): {query}")
+        print('='*60)
+    else:
+        print(f"\n{'='*60}")
+        print(f"🧮 QUERY: {query}")
+        print('='*60)
+
+def _print_ground_truth(extracted_expression, ground_truth, source=None):
+    """Print the extracted expression and its Python evaluation"""
     if extracted_expression and ground_truth is not None:
-        print(f"📐 Extracted expression: {extracted_expression}")
+        path = {'local': ' (local parser)', 'llm': ' (LLM)'}.get(source, '')
+        print(f"📐 Extracted expression: {extracted_expression}{path}")
         print(f"🧮 Python eval result: {ground_truth}")
         print()
+
+def _print_run_result(run, repeat):
+    """Print the per-run result block"""
+    # Print final result summary for single runs
+    if repeat == 1:
+        print_final_result(run.tool_tracker)
+        return
     
-    results = []
-    numerical_results = []
-    execution_times = []
+    # Show tool summary for multiple runs
+    print_tool_summary(run.tool_tracker)
+    
+    if run.successful_calculation and run.final_answer:
+        print(f"\n🎯 FINAL ANSWER (Run {run.run_number}): {run.final_answer}")
+        if run.value is not None:
+            print(f"📊 Extracted value: {run.value}")
+    elif run.final_answer:
+        print(f"\n🤖 FINAL RESPONSE (Run {run.run_number}): {run.final_answer}")
+    else:
+        print(f"\n❌ No valid result obtained (Run {run.run_number})")
+    if run.budget_exhausted:
+        print(f"⛔ Budget exhausted: {run.budget_exhausted}")
+    print(f"⏱️  Execution time: {run.execution_time:.2f} seconds")
+    _print_timing_breakdown(run.timings)
+
+def _print_timing_breakdown(timings):
+    """Print where a run's time went"""
+    if not timings:
+        return
+    ttfc = timings['time_to_first_chunk']
+    print(f"🧩 Breakdown - LLM: {timings['llm']:.2f}s, Tools: {timings['tools']:.2f}s, "
+          f"Overhead: {timings['overhead']:.2f}s, First chunk: {ttfc if ttfc is not None else 0:.2f}s")
+
+def _print_adaptive_stop(calculation):
+    """Print how many runs an adaptive repeat spent and why it stopped"""
+    if calculation.stop_reason is None:
+        return
+    reason = {
+        'confident': "consistency established",
+        'disagreement': "a run disagreed",
+        'max_runs': "run limit reached",
+    }[calculation.stop_reason]
+    print(f"🧪 Adaptive repeat: {len(calculation.runs)}/{calculation.max_runs} runs ({reason})")
+
+def _print_validation_summary(calculation):
+    """Print the final validation summary for a CalculationResult"""
+    verdict = calculation.verdict
+    ground_truth = calculation.ground_truth
+    agent_result = calculation.agent_result
+    repeat = len(calculation.runs)
     
-    # Run calculation multiple times if repeat > 1
-    for run_num in range(repeat):
-        if repeat > 1:
-            print(f"\n{'='*60}")
-            print(f"🧮 QUERY (Run {run_num + 1}/{repeat}): {query}")
-            print('='*60)
-        else:
-            print(f"\n{'='*60}")
-            print(f"🧮 QUERY: {query}")
-            print('='*60)
-        
-        start_time = time.time()
-        
-        # Stream the agent execution to see tool calls
-        result = None
-        successful_calculation = False
-        final_answer = None
-        
-        tool_tracker = {'calls': [], 'results': [], 'pending_calls': {}, 'last_result': None}
-        for chunk in agent.stream({"messages": [HumanMessage(content=query)]}):
-            if repeat == 1:  # Only show detailed output for single runs
-                tool_tracker = print_tool_execution_details(chunk, tool_tracker)
-            else:  # For multiple runs, just track tools without detailed printing
-                for node, data in chunk.items():
-                    if 'messages' in data:
-                        for message in data['messages']:
-                            if hasattr(message, 'tool_calls') and message.tool_calls:
-                                tool_tracker['calls'].extend(message.tool_calls)
-                            elif isinstance(message, ToolMessage):
-                                tool_tracker['results'].append({'name': message.name, 'content': message.content})
-                                tool_tracker['last_result'] = message.content
-            result = chunk
-            
-            # Check for successful tool execution
-            if 'agent' in chunk and 'messages' in chunk['agent']:
-                for message in chunk['agent']['messages']:
-                    if isinstance(message, ToolMessage):
-                        successful_calculation = True
-                        final_answer = message.content
-                    elif isinstance(message, AIMessage) and message.content:
-                        final_answer = message.content
-        
-        end_time = time.time()
-        execution_time = end_time - start_time
-        execution_times.append(execution_time)
-        
-        # Store results
-        results.append({
-            'result': result,
-            'successful_calculation': successful_calculation,
-            'final_answer': final_answer,
-            'execution_time': execution_time,
-            'tools_used': len(tool_tracker['results']) > 0
-        })
-        
-        # Print final result summary for single runs
-        if repeat == 1:
-            print_final_result(tool_tracker)
-        
-        # Extract numerical result for validation
-        numerical_result = extract_numerical_result(final_answer)
-        numerical_results.append(numerical_result)
-        
-        # Display result for this run
-        if repeat > 1:
-            # Show tool summary for multiple runs
-            print_tool_summary(tool_tracker)
-            
-            if successful_calculation and final_answer:
-                print(f"\n🎯 FINAL ANSWER (Run {run_num + 1}): {final_answer}")
-                if numerical_result is not None:
-                    print(f"📊 Extracted value: {numerical_result}")
-            elif final_answer:
-                print(f"\n🤖 FINAL RESPONSE (Run {run_num + 1}): {final_answer}")
-            else:
-                print(f"\n❌ No valid result obtained (Run {run_num + 1})")
-            print(f"⏱️  Execution time: {execution_time:.2f} seconds")
-    
-    # Display final summary
     if repeat == 1:
-        # Single run - display as before
-        result_info = results[0]
-        if result_info['final_answer']:
-            print(f"\n🤖 FINAL RESPONSE: {result_info['final_answer']}")
-            
-            # Check if tools were actually used
-            tools_were_used = result_info['tools_used']
-            agent_result = numerical_results[0] if numerical_results[0] is not None else None
-            
-            if tools_were_used:
-                # Tools were used - validate normally
-                if ground_truth is not None and agent_result is not None:
-                    # Use a reasonable tolerance for floating point comparison (0.01 for practical precision)
-                    if abs(agent_result - ground_truth) < 0.01:
-                        print(f"🔍 VALIDATION: ✅ correct")
-                    else:
-                        print(f"🔍 VALIDATION: ❌ wrong (Agent: {agent_result}, Python: {round(ground_truth, 6)})")
-                elif ground_truth is not None:
-                    print(f"🔍 VALIDATION: ⚠️ unable to extract agent result")
-                elif agent_result is not None:
-                    print(f"🔍 VALIDATION: ⚠️ unable to extract expression")
-                else:
-                    print(f"🔍 VALIDATION: ⚠️ unable to validate")
-            else:
-                # No tools were used
-                print(f"🔍 VALIDATION: ⚠️ no tools used")
-            
-            print(f"✅ Calculation completed successfully!")
-        else:
+        run = calculation.runs[0]
+        if verdict == 'failed':
             print(f"\n❌ No valid result obtained")
             print(f"🔍 VALIDATION: ❌ failed")
+        else:
+            print(f"\n🤖 FINAL RESPONSE: {run.final_answer}")
+            print({
+                'correct': "🔍 VALIDATION: ✅ correct",
+                'wrong': f"🔍 VALIDATION: ❌ wrong (Agent: {agent_result}, Python: {round(ground_truth or 0, 6)})",
+                'no_agent_result': "🔍 VALIDATION: ⚠️ unable to extract agent result",
+                'no_expression': "🔍 VALIDATION: ⚠️ unable to extract expression",
+                'unvalidated': "🔍 VALIDATION: ⚠️ unable to validate",
+                'no_tools': "🔍 VALIDATION: ⚠️ no tools used",
+                'budget_exhausted': f"🔍 VALIDATION: ⚠️ budget exhausted ({run.budget_exhausted})",
+            }[verdict])
+            if verdict != 'budget_exhausted':
+                print(f"✅ Calculation completed successfully!")
         
-        print(f"\n⏱️  Execution time: {result_info['execution_time']:.2f} seconds")
+        _print_adaptive_stop(calculation)
+        print(f"\n⏱️  Execution time: {run.execution_time:.2f} seconds")
+        _print_timing_breakdown(run.timings)
     else:
         # Multiple runs - show validation summary
         print(f"\n{'='*60}")
         print(f"📋 VALIDATION SUMMARY ({repeat} runs)")
         print('='*60)
+        _print_adaptive_stop(calculation)
         
-        # Check consistency of numerical results
-        valid_results = [r for r in numerical_results if r is not None]
-        if len(valid_results) > 0:
-            all_same = all(abs(r - valid_results[0]) < 1e-10 for r in valid_results)
-            agent_result = valid_results[0] if valid_results else None
-            
-            # Compare with ground truth if available
-            if ground_truth is not None and agent_result is not None:
-                ground_truth_match = abs(agent_result - ground_truth) < 0.01
-                
-                # Also check LLM final answers across runs
-                llm_results = []
-                for result_info in results:
-                    if result_info['final_answer']:
-                        llm_result = extract_numerical_result(result_info['final_answer'])
-                        if llm_result is not None:
-                            llm_results.append(llm_result)
-                
-                llm_consistent = len(llm_results) > 0 and all(abs(r - llm_results[0]) < 1e-10 for r in llm_results)
-                llm_matches_ground_truth = len(llm_results) > 0 and abs(llm_results[0] - ground_truth) < 1e-10
-                
-                if all_same and ground_truth_match:
-                    print(f"🔍 VALIDATION: ✅ correct (all {repeat} runs consistent)")
-                else:
-                    print(f"🔍 VALIDATION: ❌ wrong (Agent: {agent_result}, Python: {round(ground_truth, 6)})")
-                    if not all_same:
-                        print(f"   • Inconsistent results: {valid_results}")
-                    if not ground_truth_match:
-                        print(f"   • Wrong answer: difference of {abs(agent_result - ground_truth):.6f}")
-            else:
-                if all_same:
-                    print(f"✅ VALIDATION PASSED: All {len(valid_results)} results are consistent")
-                    print(f"🎯 Consistent result: {valid_results[0]}")
-                else:
-                    print(f"❌ VALIDATION FAILED: Results are inconsistent")
-                    print(f"📊 Results: {valid_results}")
+        valid_results = [value for value in calculation.values if value is not None]
+        if verdict == 'correct':
+            print(f"🔍 VALIDATION: ✅ correct (all {repeat} runs consistent)")
+        elif verdict == 'wrong':
+            print(f"🔍 VALIDATION: ❌ wrong (Agent: {agent_result}, Python: {round(ground_truth, 6)})")
+            for detail in calculation.details:
+                print(f"   • {detail}")
+        elif verdict == 'consistent':
+            print(f"✅ VALIDATION PASSED: All {len(valid_results)} results are consistent")
+            print(f"🎯 Consistent result: {valid_results[0]}")
+        elif verdict == 'inconsistent':
+            print(f"❌ VALIDATION FAILED: Results are inconsistent")
+            print(f"📊 Results: {valid_results}")
+        elif ground_truth is not None:
+            print(f"⚠️  VALIDATION INCONCLUSIVE: No agent results extracted")
+            print(f"🧮 Python eval: {ground_truth}")
         else:
-            if ground_truth is not None:
-                print(f"⚠️  VALIDATION INCONCLUSIVE: No agent results extracted")
-                print(f"🧮 Python eval: {ground_truth}")
-            else:
-                print(f"⚠️  VALIDATION INCONCLUSIVE: No numerical results extracted")
+            print(f"⚠️  VALIDATION INCONCLUSIVE: No numerical results extracted")
         
         # Show execution time statistics
+        execution_times = calculation.execution_times
         avg_time = sum(execution_times) / len(execution_times)
         min_time = min(execution_times)
         max_time = max(execution_times)
         print(f"\n⏱️  Execution times - Avg: {avg_time:.2f}s, Min: {min_time:.2f}s, Max: {max_time:.2f}s")
+        
+        # Percentiles of the total and of each part of the runs
+        summary = calculation.latency_summary()
+        for name, label in (('execution_time', 'Total'), ('llm', 'LLM'), ('tools', 'Tools'),
+                            ('overhead', 'Overhead'), ('time_to_first_chunk', 'First chunk')):
+            stats = summary[name]
+            if stats['count']:
+                print(f"   {label:<12} p50: {stats['p50']:.3f}s, p90: {stats['p90']:.3f}s, p99: {stats['p99']:.3f}s")
+    
+    if calculation.extraction_time is not None:
+        print(f"📐 Expression extraction: {calculation.extraction_time:.3f}s")
     
     print(f"{'='*60}")
+
+def run_calculation(agent, query, repeat=1, quiet=False, results_file=None, adaptive=False,
+                    confidence=DEFAULT_CONFIDENCE, max_failure_rate=DEFAULT_MAX_FAILURE_RATE):
+    """Run a calculation query and show detailed execution with optional validation.
+    
+    Args:
+        agent: The calculator agent to use
+        query: The calculation query string
+        repeat: Number of times to run the calculation for validation (default=1);
+            the maximum number of runs in adaptive mode
+        quiet: Suppress all console output and return a CalculationResult
+        results_file: Optional .jsonl/.json or .csv file to append the latency
+            record to (see CalculationResult.latency_record)
+        adaptive: Stop repeating as soon as a run disagrees, or once enough
+            runs agree to rule out max_failure_rate with the given confidence
+            (see calculation_result.runs_for_confidence)
+        confidence: Confidence required for an adaptive consistency verdict
+        max_failure_rate: Disagreement rate an adaptive repeat must rule out
+    
+    Returns:
+        The result from the last execution, or a CalculationResult when quiet=True
+    
+    Raises:
+        ValueError: If adaptive and confidence or max_failure_rate is out of range
+    """
+    if repeat < 1:
+        repeat = 1
+    required_runs = runs_for_confidence(confidence, max_failure_rate) if adaptive else None
+    
+    # Extract expression and calculate ground truth for validation
+    extraction_start = time.perf_counter()
+    extracted_expression, extraction_source = extract_expression(query, quiet=quiet)
+    ground_truth = safe_eval_expression(extracted_expression, quiet=quiet) if extracted_expression else None
+    extraction_time = time.perf_counter() - extraction_start
+    if not quiet:
+        _print_ground_truth(extracted_expression, ground_truth, extraction_source)
+    
+    runs = []
+    stop_reason = None
+    
+    # Run calculation multiple times if repeat > 1
+    for run_num in range(repeat):
+        if not quiet:
+            _print_run_header(query, run_num, repeat)
+        
+        start_time = time.time()
+        
+        # Stream the agent execution to see tool calls
+        run_state = _new_run_state(verbose=(repeat == 1 and not quiet))  # Only show detailed output for single runs
+        token = current_tracker.set(run_state['tool_tracker'])
+        # Repeats must sample the model again, or they would only compare cached responses
+        bypass_token = cache_bypass.set(run_num > 0)
+        try:
+            for chunk in agent.stream({"messages": [HumanMessage(content=query)]}):
+                _process_chunk(chunk, run_state)
+        finally:
+            cache_bypass.reset(bypass_token)
+            current_tracker.reset(token)
+        
+        run = _finish_run(run_state, run_num + 1, time.time() - start_time)
+        runs.append(run)
+        if not quiet:
+            _print_run_result(run, repeat)
+        
+        if adaptive:
+            stop_reason = adaptive_stop(runs, ground_truth, required_runs)
+            if stop_reason:
+                break
+    
+    if adaptive and stop_reason is None:
+        stop_reason = 'max_runs'
+    calculation = CalculationResult(query, extracted_expression, extraction_source, ground_truth, runs,
+                                    extraction_time=extraction_time, max_runs=repeat, stop_reason=stop_reason)
+    if results_file:
+        append_results_file(results_file, calculation.latency_record())
+    if quiet:
+        return calculation
+    
+    _print_validation_summary(calculation)
+    
+    return runs[-1].last_chunk  # Return the last result
+
+async def arun_calculation(agent, query, repeat=1, max_concurrency=None, quiet=False, results_file=None,
+                           adaptive=False, confidence=DEFAULT_CONFIDENCE,
+                           max_failure_rate=DEFAULT_MAX_FAILURE_RATE):
+    """Async version of run_calculation.
+    
+    The ground-truth expression extraction runs concurrently with the agent, and
+    repeated runs execute concurrently (bounded by max_concurrency), so a
+    validation run takes roughly as long as a single run. Per-run output for
+    repeated runs is printed in order once all runs have finished.
+    
+    In adaptive mode the stopping rules are checked as runs complete, and runs
+    still in flight are cancelled once one fires. By default only as many runs
+    as a consistency verdict needs are in flight at once, so runs that turn out
+    not to be needed are rarely started.
+    
+    Args:
+        agent: The calculator agent to use
+        query: The calculation query string
+        repeat: Number of times to run the calculation for validation (default=1);
+            the maximum number of runs in adaptive mode
+        max_concurrency: Maximum number of runs in flight at once (default: all,
+            or the runs_for_confidence() runs in adaptive mode)
+        quiet: Suppress all console output and return a CalculationResult
+        results_file: Optional .jsonl/.json or .csv file to append the latency record to
+        adaptive: Stop repeating early (see run_calculation)
+        confidence: Confidence required for an adaptive consistency verdict
+        max_failure_rate: Disagreement rate an adaptive repeat must rule out
+    
+    Returns:
+        The result from the last execution, or a CalculationResult when quiet=True
+    
+    Raises:
+        ValueError: If adaptive and confidence or max_failure_rate is out of range
+    """
+    if repeat < 1:
+        repeat = 1
+    required_runs = runs_for_confidence(confidence, max_failure_rate) if adaptive else None
+    semaphore = asyncio.Semaphore(max_concurrency or min(required_runs or repeat, repeat))
+    
+    async def extract_ground_truth():
+        start = time.perf_counter()
+        expression, source = await aextract_expression(query, quiet=quiet)
+        ground_truth = safe_eval_expression(expression, quiet=quiet) if expression else None
+        return expression, source, ground_truth, time.perf_counter() - start
+    
+    async def run_once(run_num):
+        async with semaphore:
+            start_time = time.time()
+            run_state = _new_run_state(verbose=(repeat == 1 and not quiet))
+            # Each run_once task has its own context, so concurrent runs keep separate trackers
+            current_tracker.set(run_state['tool_tracker'])
+            cache_bypass.set(run_num > 0)  # Repeats sample the model again (see run_calculation)
+            async for chunk in agent.astream({"messages": [HumanMessage(content=query)]}):
+                _process_chunk(chunk, run_state)
+            return _finish_run(run_state, run_num + 1, time.time() - start_time)
+    
+    if repeat == 1 and not quiet:
+        _print_run_header(query, 0, repeat)
+    
+    stop_reason = None
+    if adaptive:
+        extraction = asyncio.ensure_future(extract_ground_truth())
+        tasks = [asyncio.ensure_future(run_once(run_num)) for run_num in range(repeat)]
+        runs = []
+        try:
+            for next_run in asyncio.as_completed(tasks):
+                runs.append(await next_run)
+                stop_reason = adaptive_stop(runs, (await extraction)[2], required_runs)
+                if stop_reason:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        extracted_expression, extraction_source, ground_truth, extraction_time = await extraction
+        runs.sort(key=lambda run: run.run_number)
+        stop_reason = stop_reason or 'max_runs'
+    else:
+        (extracted_expression, extraction_source, ground_truth, extraction_time), *runs = await asyncio.gather(
+            extract_ground_truth(),
+            *(run_once(run_num) for run_num in range(repeat))
+        )
+    
+    calculation = CalculationResult(query, extracted_expression, extraction_source, ground_truth, runs,
+                                    extraction_time=extraction_time, max_runs=repeat, stop_reason=stop_reason)
+    if results_file:
+        append_results_file(results_file, calculation.latency_record())
+    if quiet:
+        return calculation
+    
+    if repeat == 1:
+        print()
+        _print_ground_truth(extracted_expression, ground_truth, extraction_source)
+        _print_run_result(runs[0], repeat)
+    else:
+        _print_ground_truth(extracted_expression, ground_truth, extraction_source)
+        for run_num, run in enumerate(runs):
+            _print_run_header(query, run_num, repeat)
+            _print_run_result(run, repeat)
+    
+    _print_validation_summary(calculation)
     
-    return results[-1]['result']  # Return the last result
\ No newline at end of file
+    return runs[-1].last_chunk  # Return the last result
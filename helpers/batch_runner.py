@@ -0,0 +1,235 @@
+"""
+Concurrent batch runner for calculation datasets
+
+Reads queries from a JSONL file, one object per line:
+
+    {"id": "q1", "query": "Calculate 15 + 25", "expected": 40}
+
+("id" defaults to the line number and "expected" is optional), runs them
+through the calculator agent on a bounded worker pool, and appends one result
+record per query to an output JSONL file as soon as it finishes. Queries whose
+id already has a result in the output file are skipped, so an interrupted run
+resumes where it stopped; queries that only have an error record are retried.
+
+Usage:
+    python -m helpers.batch_runner queries.jsonl results.jsonl --workers 8
+"""
+
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .agent_utils import create_calculator_agent, run_calculation
+from .calculation_result import GROUND_TRUTH_TOLERANCE
+
+DEFAULT_BATCH_WORKERS = 4
+
+def load_queries(path):
+    """Read batch items from a JSONL file.
+
+    Args:
+        path: JSONL file with {"query": ..., "id": optional, "expected": optional} per line
+
+    Returns:
+        list: Items as dicts with 'id', 'query' and 'expected' (None if not given)
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no query
+    """
+    items = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from None
+            if not item.get('query'):
+                raise ValueError(f"{path}:{line_number}: missing 'query'")
+            items.append({
+                'id': str(item.get('id', line_number)),
+                'query': item['query'],
+                'expected': item.get('expected'),
+            })
+    return items
+
+def load_completed_ids(path):
+    """Get the ids with a result in an output file (error records and a torn last line are ignored)"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record.get('verdict') != 'error':
+                    completed.add(str(record['id']))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+    return completed
+
+def truncate_torn_line(path, chunk_size=65536):
+    """Cut a partially written last line (e.g. from a killed run) off an output file.
+
+    Returns:
+        int: Number of bytes removed
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(end - chunk_size, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+def result_record(item, calculation=None, error=None):
+    """Build the output record for one query.
+
+    Args:
+        item: Batch item (id, query, expected)
+        calculation: CalculationResult of the query (None if it raised)
+        error: Error message if the query raised
+
+    Returns:
+        dict: JSON-serializable record
+    """
+    record = {'id': item['id'], 'query': item['query'], 'expected': item['expected']}
+    if calculation is None:
+        record.update(verdict='error', passed=False, error=error)
+        return record
+
+    run = calculation.runs[-1]
+    record.update(
+        verdict=calculation.verdict,
+        passed=calculation.passed,
+        value=calculation.agent_result,
+        expression=calculation.expression,
+        ground_truth=calculation.ground_truth,
+        final_answer=run.final_answer,
+        tool_calls=[{'name': call['name'], 'args': call['args'], 'result': call['result']}
+                    for call in run.tool_calls],
+        execution_time=round(sum(calculation.execution_times), 4),
+        budget_exhausted=run.budget_exhausted,
+        runs=len(calculation.runs),
+        stop_reason=calculation.stop_reason,
+    )
+    if item['expected'] is not None:
+        value = calculation.agent_result
+        record['expected_match'] = value is not None and abs(value - float(item['expected'])) < GROUND_TRUTH_TOLERANCE
+        record['passed'] = record['expected_match']
+    return record
+
+def run_batch(input_path, output_path, workers=DEFAULT_BATCH_WORKERS, repeat=1, agent=None,
+              resume=True, on_record=None, adaptive=False):
+    """Run every query of a JSONL dataset and append one result record per query.
+
+    Args:
+        input_path: JSONL file with the queries
+        output_path: JSONL file the results are appended to
+        workers: Maximum number of queries in flight
+        repeat: Runs per query (see run_calculation)
+        agent: Agent to use (default: the cached calculator agent)
+        resume: Skip queries that already have a result in output_path (errored ones are rerun)
+        on_record: Optional callback called with each record as it is written
+        adaptive: Stop repeating a query early (see run_calculation); repeat is then the maximum
+
+    Returns:
+        dict: Counts (total, skipped, completed, passed, failed, errors) and elapsed seconds
+    """
+    items = load_queries(input_path)
+    completed_ids = load_completed_ids(output_path) if resume else set()
+    pending = [item for item in items if item['id'] not in completed_ids]
+    agent = agent or create_calculator_agent()
+
+    summary = {'total': len(items), 'skipped': len(items) - len(pending), 'completed': 0,
+               'passed': 0, 'failed': 0, 'errors': 0}
+    start = time.time()
+
+    def run_item(item):
+        try:
+            return result_record(item, run_calculation(agent, item['query'], repeat=repeat, quiet=True,
+                                                         adaptive=adaptive))
+        except Exception as e:
+            return result_record(item, error=f"{type(e).__name__}: {e}")
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    if resume:
+        truncate_torn_line(output_path)  # Otherwise the first new record would be glued onto it
+    with open(output_path, 'a' if resume else 'w') as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        queue = iter(pending)
+        in_flight = set()
+        while True:
+            # Keep at most `workers` queries submitted, so huge datasets aren't queued at once
+            while len(in_flight) < workers:
+                item = next(queue, None)
+                if item is None:
+                    break
+                in_flight.add(executor.submit(run_item, item))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()  # Each finished query is a checkpoint
+
+                summary['completed'] += 1
+                if record['verdict'] == 'error':
+                    summary['errors'] += 1
+                elif record['passed']:
+                    summary['passed'] += 1
+                else:
+                    summary['failed'] += 1
+                if on_record:
+                    on_record(record)
+
+    summary['elapsed'] = time.time() - start
+    return summary
+
+def main():
+    """Run a batch from the command line"""
+    parser = argparse.ArgumentParser(description="Run a JSONL dataset of calculation queries")
+    parser.add_argument("input", help="JSONL file with {id, query, expected} per line")
+    parser.add_argument("output", help="JSONL file the result records are appended to")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS, help="Queries run at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per query")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Stop repeating a query once its runs agree or one disagrees")
+    parser.add_argument("--tool-set", default="basic", help="Calculator tool set (basic, expression, vector, all)")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    def report(record):
+        icon = {'error': '💥'}.get(record['verdict'], '✅' if record['passed'] else '❌')
+        print(f"{icon} [{record['id']}] {record['query']} -> {record.get('value', record.get('error'))}")
+
+    print(f"🚀 Running {args.input} with {args.workers} workers")
+    summary = run_batch(
+        args.input,
+        args.output,
+        workers=args.workers,
+        repeat=args.repeat,
+        agent=create_calculator_agent(args.tool_set),
+        resume=not args.no_resume,
+        on_record=report,
+        adaptive=args.adaptive,
+    )
+    print(f"\n📋 {summary['completed']} run, {summary['skipped']} skipped (already in {args.output})")
+    print(f"   ✅ {summary['passed']} passed, ❌ {summary['failed']} failed, 💥 {summary['errors']} errors")
+    print(f"⏱️  {summary['elapsed']:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
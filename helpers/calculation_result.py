@@ -0,0 +1,292 @@
+import os
+import csv
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+# Tolerance for comparing an agent answer with the Python ground truth
+GROUND_TRUTH_TOLERANCE = 0.01
+
+# Tolerance for deciding that repeated runs agree with each other
+CONSISTENCY_TOLERANCE = 1e-10
+
+# Percentiles reported by latency_stats
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# Timing components summarized across runs (keys of CalculationRun.timings)
+TIMING_COMPONENTS = ('time_to_first_chunk', 'llm', 'tools', 'overhead')
+
+# Adaptive repeat defaults: stop once the agreeing runs rule out a failure rate
+# of DEFAULT_MAX_FAILURE_RATE or more with DEFAULT_CONFIDENCE
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_FAILURE_RATE = 0.5
+
+def runs_for_confidence(confidence=DEFAULT_CONFIDENCE, max_failure_rate=DEFAULT_MAX_FAILURE_RATE):
+    """Number of consecutive agreeing runs needed to establish consistency.
+
+    If a run disagreed with probability max_failure_rate or more, n agreeing
+    runs in a row would happen with probability at most (1 - max_failure_rate)^n.
+    The smallest n that pushes this below 1 - confidence is returned.
+
+    Args:
+        confidence: Required confidence, between 0 and 1 (e.g. 0.95)
+        max_failure_rate: Smallest disagreement rate to rule out, between 0 and 1
+
+    Returns:
+        int: Required number of runs (at least 1)
+
+    Raises:
+        ValueError: If confidence or max_failure_rate is not strictly between 0 and 1
+    """
+    if not 0 < confidence < 1 or not 0 < max_failure_rate < 1:
+        raise ValueError("confidence and max_failure_rate must be between 0 and 1")
+    return max(1, math.ceil(math.log(1 - confidence) / math.log(1 - max_failure_rate)))
+
+def run_agrees(run, reference, ground_truth=None):
+    """Whether a run agrees with the ground truth (or, without one, with a reference value)"""
+    if run.value is None or run.budget_exhausted:
+        return False
+    if ground_truth is not None:
+        return abs(run.value - ground_truth) < GROUND_TRUTH_TOLERANCE
+    return reference is None or abs(run.value - reference) < CONSISTENCY_TOLERANCE
+
+def adaptive_stop(runs, ground_truth=None, required_runs=None):
+    """Check the stopping rules of an adaptive repeat.
+
+    Args:
+        runs: Runs completed so far, in completion order
+        ground_truth: Python evaluation of the expression (None if unavailable)
+        required_runs: Agreeing runs needed (see runs_for_confidence)
+
+    Returns:
+        str or None: 'disagreement' as soon as a run disagrees, 'confident' once
+        required_runs runs agree, or None to keep going
+    """
+    if not runs:
+        return None
+    if not run_agrees(runs[-1], runs[0].value, ground_truth):
+        return 'disagreement'
+    if required_runs and len(runs) >= required_runs:
+        return 'confident'
+    return None
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def latency_stats(values):
+    """Summarize latencies.
+
+    Args:
+        values: Durations in seconds
+
+    Returns:
+        dict: count, mean, min, max and p50/p90/p99 (None values when empty)
+    """
+    values = [value for value in values if value is not None]
+    stats = {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else None,
+        'min': min(values) if values else None,
+        'max': max(values) if values else None,
+    }
+    for pct in LATENCY_PERCENTILES:
+        stats[f'p{pct}'] = percentile(values, pct)
+    return stats
+
+def append_results_file(path, record):
+    """Append a flat record to a results file.
+
+    Files ending in .csv get a CSV row (with a header when the file is new);
+    anything else gets one JSON object per line.
+
+    Args:
+        path: Results file
+        record: Flat dict of JSON-serializable values
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if path.endswith('.csv'):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(record))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(record)
+    else:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+@dataclass
+class CalculationRun:
+    """Outcome of a single agent run.
+
+    Attributes:
+        run_number: 1-based index of the run
+        final_answer: Final text answer (or last tool result) from the agent
+        value: Numerical value extracted from the final answer
+        successful_calculation: Whether a tool result was the final answer
+        tools_used: Whether any tool returned a result
+        tool_calls: Tool calls as dicts (name, args, result, duration, ...)
+        execution_time: Wall-clock seconds for the run
+        budget_exhausted: Why the run was stopped early ('max_llm_calls',
+            'max_tool_calls', 'deadline' or 'loop'), or None
+        timings: Seconds spent per part of the run: time_to_first_chunk, llm
+            (model node), tools (tool node), overhead (everything else) and
+            nodes (per graph node)
+        last_chunk: The last chunk streamed from the agent
+        tool_tracker: The ToolTracker that recorded the run
+    """
+    run_number: int
+    final_answer: Optional[str]
+    value: Optional[float]
+    successful_calculation: bool
+    tools_used: bool
+    tool_calls: List[dict]
+    execution_time: float
+    budget_exhausted: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    last_chunk: Any = field(default=None, repr=False)
+    tool_tracker: Any = field(default=None, repr=False)
+
+@dataclass
+class CalculationResult:
+    """Outcome of run_calculation over one or more runs.
+
+    The verdict is one of:
+        single run: 'correct', 'wrong', 'no_tools', 'no_agent_result',
+            'no_expression', 'unvalidated', 'budget_exhausted' or 'failed'
+        multiple runs: 'correct', 'wrong', 'consistent', 'inconsistent' or 'inconclusive'
+
+    Attributes:
+        query: The calculation query
+        expression: Expression extracted for the ground truth (None if not found)
+        expression_source: 'local', 'llm' or None (see extract_expression)
+        ground_truth: Python evaluation of the expression
+        runs: One CalculationRun per execution
+        extraction_time: Seconds spent extracting and evaluating the ground truth
+        max_runs: Runs requested (the cap in adaptive mode; defaults to len(runs))
+        stop_reason: Why an adaptive repeat stopped ('confident', 'disagreement'
+            or 'max_runs'), or None when every requested run was executed
+        verdict: Validation verdict (computed from the runs)
+        details: Human-readable reasons behind a 'wrong' verdict
+    """
+    query: str
+    expression: Optional[str]
+    expression_source: Optional[str]
+    ground_truth: Optional[float]
+    runs: List[CalculationRun]
+    extraction_time: Optional[float] = None
+    max_runs: Optional[int] = None
+    stop_reason: Optional[str] = None
+    verdict: str = field(init=False)
+    details: List[str] = field(init=False, default_factory=list)
+
+    def __post_init__(self):
+        if self.max_runs is None:
+            self.max_runs = len(self.runs)
+        self.verdict = self._validate()
+
+    @property
+    def runs_saved(self):
+        """Requested runs that an adaptive repeat did not need"""
+        return self.max_runs - len(self.runs)
+
+    @property
+    def answers(self):
+        return [run.final_answer for run in self.runs]
+
+    @property
+    def values(self):
+        return [run.value for run in self.runs]
+
+    @property
+    def execution_times(self):
+        return [run.execution_time for run in self.runs]
+
+    @property
+    def agent_result(self):
+        """The first numerical value extracted from the runs"""
+        return next((value for value in self.values if value is not None), None)
+
+    @property
+    def budget_exhausted(self):
+        """Runs stopped early, as (run number, reason) pairs"""
+        return [(run.run_number, run.budget_exhausted) for run in self.runs if run.budget_exhausted]
+
+    @property
+    def passed(self):
+        return self.verdict in ('correct', 'consistent')
+
+    def latency_summary(self):
+        """Latency statistics over the runs.
+
+        Returns:
+            dict: latency_stats of execution_time and of each timing component
+            (time_to_first_chunk, llm, tools, overhead), plus extraction_time
+        """
+        summary = {'execution_time': latency_stats(self.execution_times)}
+        for component in TIMING_COMPONENTS:
+            summary[component] = latency_stats([run.timings.get(component) for run in self.runs])
+        summary['extraction_time'] = self.extraction_time
+        return summary
+
+    def latency_record(self):
+        """Flat latency record for a results file (one row per run_calculation call)"""
+        record = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'query': self.query,
+            'runs': len(self.runs),
+            'max_runs': self.max_runs,
+            'stop_reason': self.stop_reason,
+            'verdict': self.verdict,
+            'extraction_time': self.extraction_time,
+        }
+        for name, stats in self.latency_summary().items():
+            if isinstance(stats, dict):
+                for stat in ('mean', 'p50', 'p90', 'p99', 'max'):
+                    record[f'{name}_{stat}'] = stats[stat]
+        return record
+
+    def _validate(self):
+        if len(self.runs) == 1:
+            run = self.runs[0]
+            if not run.final_answer:
+                return 'failed'
+            if run.budget_exhausted:
+                return 'budget_exhausted'
+            if not run.tools_used:
+                return 'no_tools'
+            if self.ground_truth is not None and run.value is not None:
+                return 'correct' if abs(run.value - self.ground_truth) < GROUND_TRUTH_TOLERANCE else 'wrong'
+            if self.ground_truth is not None:
+                return 'no_agent_result'
+            if run.value is not None:
+                return 'no_expression'
+            return 'unvalidated'
+
+        # Check consistency of numerical results
+        valid_results = [value for value in self.values if value is not None]
+        if not valid_results:
+            return 'inconclusive'
+        all_same = all(abs(r - valid_results[0]) < CONSISTENCY_TOLERANCE for r in valid_results)
+        if self.ground_truth is None:
+            return 'consistent' if all_same else 'inconsistent'
+
+        agent_result = valid_results[0]
+        ground_truth_match = abs(agent_result - self.ground_truth) < GROUND_TRUTH_TOLERANCE
+        if all_same and ground_truth_match:
+            return 'correct'
+        if not all_same:
+            self.details.append(f"Inconsistent results: {valid_results}")
+        if not ground_truth_match:
+            self.details.append(f"Wrong answer: difference of {abs(agent_result - self.ground_truth):.6f}")
+        return 'wrong'
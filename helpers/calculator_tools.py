@@ -1,4 +1,8 @@
-from langchain_core.tools import tool
+import math
+from typing import List
+from langchain_core.tools import tool, ToolException
+from .expression_eval import evaluate_bounded
+from .tool_memo import memoize_tools
 
 @tool
 def add(a: float, b: float) -> float:
@@ -57,10 +61,82 @@ def divide(a: float, b: float) -> float:
         raise ValueError("Cannot divide by zero")
     return a / b
 
-def get_calculator_tools():
-    """Get all calculator tools as a list.
+@tool
+def evaluate_expression(expression: str) -> float:
+    """Evaluate a whole arithmetic expression in one step.
+    
+    Args:
+        expression: Expression using numbers, + - * / ** % // and parentheses,
+            e.g. "((15 + 25) * 3) / (43 - 12 * 5)"
+        
+    Returns:
+        The value of the expression
+        
+    Raises:
+        ToolException: If the expression is invalid, divides by zero or is too expensive to evaluate
+    """
+    result = evaluate_bounded(expression)
+    if not result.ok:
+        raise ToolException(f"Cannot evaluate '{expression}': {result.reason}")
+    return result.value
+
+# Rejected expressions reach the agent as an error message instead of aborting the run
+evaluate_expression.handle_tool_error = True
+
+@tool
+def sum_all(numbers: List[float]) -> float:
+    """Add a list of numbers together.
+    
+    Args:
+        numbers: Numbers to add
+        
+    Returns:
+        The sum of all the numbers
+    """
+    return math.fsum(numbers)
+
+@tool
+def product_all(numbers: List[float]) -> float:
+    """Multiply a list of numbers together.
+    
+    Args:
+        numbers: Numbers to multiply
+        
+    Returns:
+        The product of all the numbers
+    """
+    return math.prod(numbers)
+
+# Tool sets selectable through get_calculator_tools()
+TOOL_SETS = {
+    "basic": [add, subtract, multiply, divide],
+    "expression": [evaluate_expression],
+    "vector": [sum_all, product_all],
+    "all": [add, subtract, multiply, divide, evaluate_expression, sum_all, product_all],
+}
+
+# Every calculator tool is pure, so memoize_tool may cache its results
+for _tool in TOOL_SETS["all"]:
+    _tool.metadata = dict(_tool.metadata or {}, pure=True)
+
+def get_calculator_tools(tool_set="basic", memoize=False):
+    """Get calculator tools as a list.
+    
+    The "expression" tool evaluates a whole expression in a single call, so a
+    multi-step calculation costs one model/tool round trip instead of one per
+    operation.
+    
+    Args:
+        tool_set: "basic" (add, subtract, multiply, divide), "expression"
+            (evaluate_expression), "vector" (sum_all, product_all) or "all"
+        memoize: Answer repeated identical calls from the shared tool memo
+            cache (see helpers.tool_memo)
     
     Returns:
         List of calculator tool functions
     """
-    return [add, subtract, multiply, divide]
\ No newline at end of file
+    if tool_set not in TOOL_SETS:
+        raise ValueError(f"Unknown tool set '{tool_set}', expected one of: {', '.join(TOOL_SETS)}")
+    if memoize:
+        return memoize_tools(TOOL_SETS[tool_set])
+    return list(TOOL_SETS[tool_set])
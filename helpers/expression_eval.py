@@ -0,0 +1,363 @@
+import ast
+import math
+import operator
+import threading
+import multiprocessing
+from functools import lru_cache
+
+# Number of compiled programs kept in the LRU cache
+COMPILE_CACHE_SIZE = 4096
+
+# Cost bounds: expressions within both limits are evaluated inline
+MAX_INLINE_EXPONENT = 10000
+MAX_INLINE_BITS = 65536
+
+# Expressions estimated above this many bits are rejected without being run
+MAX_POOL_BITS = 2 ** 32
+
+# Limits for expressions evaluated in the worker pool
+DEFAULT_EVAL_TIMEOUT = 2.0                  # Seconds
+DEFAULT_EVAL_MEMORY_LIMIT = 256 * 1024 ** 2  # Bytes of address space per worker
+DEFAULT_EVAL_WORKERS = 2
+
+# Floats never exceed this many bits (larger results raise OverflowError)
+FLOAT_BITS = 1024
+
+# Constant subexpressions up to this many bits are folded while estimating cost
+MAX_FOLD_BITS = 64
+
+# Opcodes of the flat stack program
+PUSH, BINARY, UNARY = 0, 1, 2
+
+# Safe operators (built once, shared by every program)
+BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+    ast.FloorDiv: operator.floordiv,
+}
+
+UNARY_OPS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+class CompiledExpression:
+    """A validated arithmetic expression compiled to a flat stack program.
+
+    The numeric literals of the expression are operand slots: evaluate() uses the
+    original literals by default, and evaluate_batch() substitutes whole arrays of
+    operand values to evaluate the same expression shape many times at once.
+
+    Attributes:
+        expression: The source expression text
+        program: Tuple of (opcode, argument) instructions in postfix order
+        operands: The numeric literals, in the order they appear in the expression
+        max_bits: Upper bound on the bit length of any intermediate result
+        max_exponent: Upper bound on any integer exponent (0 if there is no power)
+    """
+
+    __slots__ = ('expression', 'program', 'operands', 'max_bits', 'max_exponent')
+
+    def __init__(self, expression, program, operands):
+        self.expression = expression
+        self.program = program
+        self.operands = operands
+        self.max_bits, self.max_exponent = estimate_cost(program, operands)
+
+    @property
+    def is_cheap(self):
+        """Whether the expression is within the inline evaluation bounds"""
+        return self.max_bits <= MAX_INLINE_BITS and self.max_exponent <= MAX_INLINE_EXPONENT
+
+    def __repr__(self):
+        return f"CompiledExpression({self.expression!r}, operands={len(self.operands)})"
+
+    def evaluate(self, operands=None):
+        """Run the program.
+
+        Args:
+            operands: Values for the operand slots (default: the expression's literals)
+
+        Returns:
+            The result of the expression (int or float)
+        """
+        values = self.operands if operands is None else operands
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for opcode, argument in self.program:
+            if opcode == PUSH:
+                push(values[argument])
+            elif opcode == BINARY:
+                right = pop()
+                stack[-1] = argument(stack[-1], right)
+            else:
+                stack[-1] = argument(stack[-1])
+        return stack[0]
+
+    def evaluate_batch(self, operands):
+        """Evaluate the program over NumPy arrays of operand values.
+
+        Args:
+            operands: Array of shape (n, len(self.operands)); row i holds the operand
+                values of the i-th expression instance
+
+        Returns:
+            numpy.ndarray: n float results (inf/nan where a row divides by zero)
+        """
+        import numpy as np
+
+        matrix = np.asarray(operands, dtype=float)
+        if matrix.ndim != 2 or matrix.shape[1] != len(self.operands):
+            raise ValueError(f"Expected operands of shape (n, {len(self.operands)}), got {matrix.shape}")
+
+        columns = [matrix[:, i] for i in range(matrix.shape[1])]
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return np.asarray(self.evaluate(columns), dtype=float)
+
+def _bit_length(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return FLOAT_BITS  # e.g. the literal 1e400 is inf
+    return int(abs(value)).bit_length() + (0 if isinstance(value, int) else 1)
+
+def estimate_cost(program, operands):
+    """Bound the size of every intermediate result without evaluating.
+
+    Integer arithmetic is exact in Python, so "9 ** 9 ** 9" would try to build a
+    number with hundreds of millions of digits. Floats are bounded (overflow
+    raises immediately), so only integer results can grow expensive.
+
+    Args:
+        program: Stack program of a CompiledExpression
+        operands: Operand values of the program
+
+    Returns:
+        tuple: (maximum bit length of any intermediate, maximum integer exponent);
+        either may be float('inf')
+    """
+    # Each stack entry is (bits, is_int, exact value if known)
+    stack = []
+    max_bits = 0
+    max_exponent = 0
+    for opcode, argument in program:
+        if opcode == PUSH:
+            value = operands[argument]
+            entry = (_bit_length(value), isinstance(value, int), value)
+        elif opcode == UNARY:
+            bits, is_int, value = stack.pop()
+            entry = (bits, is_int, argument(value) if value is not None else None)
+        else:
+            right_bits, right_int, right_value = stack.pop()
+            left_bits, left_int, left_value = stack.pop()
+            is_int = left_int and right_int
+            if argument is operator.add or argument is operator.sub:
+                bits = max(left_bits, right_bits) + 1
+            elif argument is operator.mul:
+                bits = left_bits + right_bits
+            elif argument is operator.truediv:
+                bits, is_int = FLOAT_BITS, False
+            elif argument is operator.floordiv:
+                bits = left_bits
+            elif argument is operator.mod:
+                bits = right_bits
+            else:  # operator.pow
+                if right_value is not None:
+                    exponent = abs(right_value)
+                else:
+                    exponent = 2 ** right_bits if right_bits < 64 else float('inf')
+                if is_int and right_value is not None and right_value < 0:
+                    is_int = False  # int ** negative int is a float
+                if left_value in (0, 1, -1):
+                    bits = left_bits  # 0, 1 and -1 stay that size whatever the exponent
+                else:
+                    if is_int:
+                        max_exponent = max(max_exponent, exponent)
+                    bits = left_bits * exponent if left_bits else 0
+            if not is_int:
+                bits = min(bits, FLOAT_BITS)
+            value = _fold(argument, left_value, right_value, bits)
+            if value is not None:
+                bits, is_int = _bit_length(value), isinstance(value, int)
+            entry = (bits, is_int, value)
+        stack.append(entry)
+        max_bits = max(max_bits, entry[0])
+    return max_bits, max_exponent
+
+def _fold(argument, left_value, right_value, bits):
+    """Exact value of a small constant subexpression, or None if unknown or too large"""
+    if left_value is None or right_value is None or bits > MAX_FOLD_BITS:
+        return None
+    try:
+        value = argument(left_value, right_value)
+    except (ArithmeticError, ValueError):
+        return None
+    return value if isinstance(value, (int, float)) else None  # Negative base ** fraction is complex
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(expression):
+    """Validate and compile an arithmetic expression, memoized by its text.
+
+    Args:
+        expression: Expression using numbers, + - * / ** % // and parentheses
+
+    Returns:
+        CompiledExpression: The compiled program
+
+    Raises:
+        ValueError: If the expression is not valid safe arithmetic
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from None
+
+    program = []
+    operands = []
+
+    def emit(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            program.append((PUSH, len(operands)))
+            operands.append(node.value)
+        elif isinstance(node, ast.BinOp):  # Binary operations
+            op = BINARY_OPS.get(type(node.op))
+            if op is None:
+                raise ValueError(f"Unsupported operation: {type(node.op)}")
+            emit(node.left)
+            emit(node.right)
+            program.append((BINARY, op))
+        elif isinstance(node, ast.UnaryOp):  # Unary operations
+            op = UNARY_OPS.get(type(node.op))
+            if op is None:
+                raise ValueError(f"Unsupported unary operation: {type(node.op)}")
+            emit(node.operand)
+            program.append((UNARY, op))
+        else:
+            raise ValueError(f"Unsupported node type: {type(node)}")
+
+    emit(tree.body)
+    return CompiledExpression(expression, tuple(program), tuple(operands))
+
+def evaluate_batch(expression, operands):
+    """Evaluate one expression shape over many operand rows.
+
+    Args:
+        expression: Template expression, e.g. "(1 + 2) * 3"; its literals mark the operand slots
+        operands: Array of shape (n, number of literals) with the values to substitute
+
+    Returns:
+        numpy.ndarray: n float results
+    """
+    return compile_expression(expression).evaluate_batch(operands)
+
+class EvaluationResult:
+    """Outcome of a bounded evaluation.
+
+    Attributes:
+        status: 'ok', 'too_expensive' or 'error'
+        value: The float result when status is 'ok', otherwise None
+        reason: Why the expression was not evaluated (None when status is 'ok')
+    """
+
+    __slots__ = ('status', 'value', 'reason')
+
+    def __init__(self, status, value=None, reason=None):
+        self.status = status
+        self.value = value
+        self.reason = reason
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+    def __repr__(self):
+        if self.ok:
+            return f"EvaluationResult(ok, value={self.value})"
+        return f"EvaluationResult({self.status}, reason={self.reason!r})"
+
+def _limit_worker_memory(memory_limit):
+    """Pool initializer: cap the worker's address space (Unix only)"""
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def _evaluate_in_worker(expression):
+    """Evaluate an expression inside a pool worker, returning (status, value or reason)"""
+    try:
+        return 'ok', float(compile_expression(expression).evaluate())
+    except MemoryError:
+        return 'too_expensive', "exceeded the evaluation memory limit"
+    except Exception as e:
+        return 'error', str(e)
+
+_pool = None
+_pool_memory_limit = None  # memory_limit the current pool's workers were started with
+_pool_lock = threading.Lock()
+
+def _get_pool(memory_limit):
+    """Worker pool capped at memory_limit (a different limit replaces the pool)"""
+    global _pool, _pool_memory_limit
+    with _pool_lock:
+        if _pool is not None and _pool_memory_limit != memory_limit:
+            _pool.terminate()
+            _pool = None
+        if _pool is None:
+            # spawn: forking a process that runs LLM client threads is not safe
+            context = multiprocessing.get_context('spawn')
+            _pool = context.Pool(DEFAULT_EVAL_WORKERS, initializer=_limit_worker_memory, initargs=(memory_limit,))
+            _pool_memory_limit = memory_limit
+        return _pool
+
+def _reset_pool():
+    """Kill the worker pool (e.g. after a timeout); it is recreated on next use"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+def evaluate_bounded(expression, timeout=DEFAULT_EVAL_TIMEOUT, memory_limit=DEFAULT_EVAL_MEMORY_LIMIT):
+    """Evaluate an expression without letting it stall the caller.
+
+    Cheap expressions run inline. Expressions whose estimated exponent or
+    intermediate size exceeds the inline bounds run in a small process pool with
+    a hard timeout and memory cap; hopeless ones are rejected without running.
+    The pool uses the spawn start method, so scripts that reach it need the
+    usual `if __name__ == "__main__":` guard.
+
+    Args:
+        expression: Mathematical expression string
+        timeout: Seconds allowed for an expression sent to the pool
+        memory_limit: Address-space cap in bytes for pool workers
+
+    Returns:
+        EvaluationResult: 'ok' with a float value, 'too_expensive' or 'error' with a reason
+    """
+    try:
+        compiled = compile_expression(expression)
+    except ValueError as e:
+        return EvaluationResult('error', reason=str(e))
+
+    if compiled.is_cheap:
+        try:
+            return EvaluationResult('ok', float(compiled.evaluate()))
+        except Exception as e:
+            return EvaluationResult('error', reason=str(e))
+
+    if compiled.max_bits > MAX_POOL_BITS:
+        return EvaluationResult('too_expensive', reason=f"result would need more than {MAX_POOL_BITS} bits")
+
+    pending = _get_pool(memory_limit).apply_async(_evaluate_in_worker, (expression,))
+    try:
+        status, payload = pending.get(timeout)
+    except multiprocessing.TimeoutError:
+        _reset_pool()
+        return EvaluationResult('too_expensive', reason=f"evaluation exceeded {timeout}s")
+    if status == 'ok':
+        return EvaluationResult('ok', payload)
+    return EvaluationResult(status, reason=payload)
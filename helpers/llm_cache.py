@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+
+# Cache defaults (overridable through the LLM_CACHE_* environment variables)
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+DEFAULT_CACHE_TTL = 0            # Seconds; 0 keeps entries until evicted
+DEFAULT_CACHE_MAX_TEMPERATURE = 0.1  # configure_llm samples at 0.1
+
+# True while LLM calls must sample the model again (e.g. the repeats of a
+# consistency check); set it like tool_tracker.current_tracker
+cache_bypass = ContextVar('llm_cache_bypass', default=False)
+
+# Classes a cached response may be deserialized into
+_ALLOWED_OBJECTS = [ChatGeneration, ChatGenerationChunk, Generation, AIMessage, AIMessageChunk]
+
+# Misses whose response never arrives (errors, cancellations) are dropped past this many
+MAX_PENDING_LOOKUPS = 1024
+
+# Message fields that change between otherwise identical requests
+_VOLATILE_FIELDS = {'id', 'tool_call_id', 'response_metadata', 'usage_metadata', 'additional_kwargs'}
+
+_TEMPERATURE_PATTERN = re.compile(r"'temperature', ([-+0-9.eE]+)")
+
+def _normalize(value):
+    """Normalize serialized messages so equivalent prompts produce the same key"""
+    if isinstance(value, dict):
+        if value.get('lc') == 1 and value.get('type') == 'constructor':
+            # Keep the message class name, drop run-specific ids and metadata
+            return {'type': value['id'][-1], 'kwargs': _normalize(value.get('kwargs', {}))}
+        return {k: _normalize(v) for k, v in sorted(value.items()) if k not in _VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    return value
+
+def _llm_temperature(llm_string):
+    """Extract the sampling temperature from a LangChain llm_string.
+
+    Returns:
+        float or None: The temperature, or None if the provider default is used
+    """
+    model_part = llm_string.split('---', 1)[0]
+    try:
+        temperature = json.loads(model_part).get('kwargs', {}).get('temperature')
+        if temperature is not None:
+            return float(temperature)
+    except (ValueError, AttributeError):
+        pass
+    match = _TEMPERATURE_PATTERN.search(llm_string)
+    return float(match.group(1)) if match else None
+
+class ResponseCache(BaseCache):
+    """Persistent, content-addressed LLM response cache backed by SQLite.
+
+    Entries are keyed by a hash of the model configuration (model, endpoint,
+    temperature, bound tools schema) and the normalized messages. The store runs
+    in WAL mode so several processes can share one cache file. Requests sampled
+    above max_temperature, and calls made while cache_bypass is set, bypass the
+    cache entirely.
+
+    Args:
+        path: SQLite database file
+        max_entries: Maximum number of entries; least recently used entries are evicted
+        ttl: Default time-to-live for new entries in seconds (0 = no expiry)
+        max_temperature: Highest temperature that is still cached
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_CACHE_MAX_ENTRIES, ttl=DEFAULT_CACHE_TTL,
+                 max_temperature=DEFAULT_CACHE_MAX_TEMPERATURE):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # (caller, key) -> lookup timestamp, used to measure latency
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'expired': 0, 'evicted': 0, 'saved_seconds': 0.0}
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    expires_at REAL,
+                    latency REAL NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+    def _connect(self):
+        """Get this thread's connection (SQLite connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, prompt, llm_string):
+        try:
+            messages = _normalize(json.loads(prompt))
+        except ValueError:
+            messages = ' '.join(prompt.split())
+        payload = json.dumps([llm_string, messages], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cacheable(self, llm_string):
+        temperature = _llm_temperature(llm_string)
+        return temperature is not None and temperature <= self.max_temperature
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def lookup(self, prompt, llm_string):
+        """Look up a cached response, returning None on a miss"""
+        return self._lookup(prompt, llm_string, threading.get_ident())
+
+    async def alookup(self, prompt, llm_string):
+        """Async lookup; latency is tracked per task, as one thread runs many concurrent calls"""
+        return await asyncio.to_thread(self._lookup, prompt, llm_string, asyncio.current_task())
+
+    def _lookup(self, prompt, llm_string, caller):
+        if cache_bypass.get() or not self._cacheable(llm_string):
+            self._count(bypassed=1)
+            return None
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at, latency FROM responses WHERE key = ?", (key,)).fetchone()
+
+        if row is not None and row[1] is not None and row[1] <= now:
+            with conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(expired=1)
+            row = None
+
+        if row is None:
+            self._count(misses=1)
+            with self._lock:
+                self._pending[(caller, key)] = time.monotonic()
+                while len(self._pending) > MAX_PENDING_LOOKUPS:
+                    self._pending.popitem(last=False)
+            return None
+
+        with conn:
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._count(hits=1, saved_seconds=row[2])
+        return [loads(generation, allowed_objects=_ALLOWED_OBJECTS) for generation in json.loads(row[0])]
+
+    def update(self, prompt, llm_string, return_val, ttl=None):
+        """Store a response.
+
+        Args:
+            prompt: Serialized prompt messages
+            llm_string: Serialized model configuration
+            return_val: Generations returned by the model
+            ttl: Time-to-live for this entry in seconds (default: the cache ttl)
+        """
+        self._update(prompt, llm_string, return_val, ttl, threading.get_ident())
+
+    async def aupdate(self, prompt, llm_string, return_val, ttl=None):
+        """Async version of update"""
+        await asyncio.to_thread(self._update, prompt, llm_string, return_val, ttl, asyncio.current_task())
+
+    def _update(self, prompt, llm_string, return_val, ttl, caller):
+        if cache_bypass.get() or not self._cacheable(llm_string):
+            return
+
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            started = self._pending.pop((caller, key), None)
+        latency = time.monotonic() - started if started is not None else 0.0
+
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        value = json.dumps([dumps(generation) for generation in return_val])
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access, expires_at, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, now, now, now + ttl if ttl else None, latency)
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,)
+                )
+                self._count(evicted=excess)
+
+    def clear(self, **kwargs):
+        """Remove every cached response"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Get hit/miss counters for this process.
+
+        Returns:
+            dict: hits, misses, bypassed, expired, evicted, hit_rate, entries and
+            saved_seconds (model latency avoided by cache hits)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return stats
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Get the process-wide response cache configured through LLM_CACHE_PATH.
+
+    Returns:
+        ResponseCache or None: The shared cache, or None if LLM_CACHE_PATH is not set
+    """
+    global _response_cache
+    if _response_cache is None and os.getenv("LLM_CACHE_PATH"):
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    os.getenv("LLM_CACHE_PATH"),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES)),
+                    ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_CACHE_TTL)),
+                    max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", DEFAULT_CACHE_MAX_TEMPERATURE)),
+                )
+    return _response_cache
+
+def enable_response_cache(cache=None):
+    """Install a response cache for every LangChain chat model in the process.
+
+    Useful for examples that build their own ChatOpenAI clients.
+
+    Args:
+        cache: Cache to install (default: the LLM_CACHE_PATH cache)
+
+    Returns:
+        ResponseCache or None: The installed cache
+    """
+    cache = cache or get_response_cache()
+    if cache is not None:
+        set_llm_cache(cache)
+    return cache
@@ -1,30 +1,246 @@
 import os
+import asyncio
+import hashlib
+import threading
+import time
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from .llm_cache import get_response_cache
 
 # Load .env file if it exists
 if os.path.exists('.env'):
     load_dotenv('.env')
 
+# Connection pool defaults (overridable through the LLM_POOL_* environment variables)
+DEFAULT_POOL_MAX_CONNECTIONS = 20
+DEFAULT_POOL_MAX_KEEPALIVE = 10
+DEFAULT_POOL_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_POOL_IDLE_TIMEOUT = 300.0
+
+class LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport that keeps a separate connection pool per event loop.
+
+    Connections opened on one asyncio event loop cannot be used from another,
+    so a single process-wide pool breaks on the second asyncio.run(). Each
+    running loop gets its own pool; pools of closed loops are dropped.
+
+    Args:
+        **transport_kwargs: Arguments for each loop's httpx.AsyncHTTPTransport (e.g. limits)
+    """
+
+    def __init__(self, **transport_kwargs):
+        self._transport_kwargs = transport_kwargs
+        self._transports = {}  # event loop -> httpx.AsyncHTTPTransport
+        self._lock = threading.Lock()
+
+    def _loop_transport(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                # Connections of a closed loop can't be closed from here; they go with their loop
+                for closed in [other for other in self._transports if other.is_closed()]:
+                    del self._transports[closed]
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._transport_kwargs)
+        return transport
+
+    async def handle_async_request(self, request):
+        return await self._loop_transport().handle_async_request(request)
+
+    async def aclose(self):
+        """Close the running loop's pool"""
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+class LLMClientRegistry:
+    """Process-wide registry of shared, thread-safe ChatOpenAI clients.
+
+    Clients are keyed by (base_url, model, temperature, api key) and reused across
+    calls. All clients that talk to the same endpoint share one keep-alive httpx
+    connection pool for invoke/stream, and one pool per event loop for
+    ainvoke/astream (see LoopLocalAsyncTransport), so repeated queries skip the
+    TCP/TLS handshake and the client construction cost.
+
+    Evicting an idle endpoint only drops the registry's references: clients
+    already handed out (e.g. inside cached agents) keep working, and their
+    pools are closed when they are garbage collected.
+
+    Args:
+        max_connections: Maximum number of open connections per endpoint
+        max_keepalive_connections: Maximum number of idle connections kept open per endpoint
+        keepalive_expiry: Seconds an idle connection is kept before being closed
+        idle_timeout: Seconds after which an unused endpoint (and its clients) is evicted
+    """
+
+    def __init__(self, max_connections=None, max_keepalive_connections=None,
+                 keepalive_expiry=None, idle_timeout=None):
+        self.max_connections = max_connections or int(
+            os.getenv("LLM_POOL_MAX_CONNECTIONS", DEFAULT_POOL_MAX_CONNECTIONS))
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("LLM_POOL_MAX_KEEPALIVE", DEFAULT_POOL_MAX_KEEPALIVE))
+        self.keepalive_expiry = keepalive_expiry or float(
+            os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", DEFAULT_POOL_KEEPALIVE_EXPIRY))
+        self.idle_timeout = idle_timeout or float(
+            os.getenv("LLM_POOL_IDLE_TIMEOUT", DEFAULT_POOL_IDLE_TIMEOUT))
+
+        self._lock = threading.Lock()
+        self._pools = {}      # base_url -> (httpx.Client, httpx.AsyncClient)
+        self._clients = {}    # (base_url, model, temperature, key hash) -> ChatOpenAI
+        self._last_used = {}  # base_url -> monotonic timestamp
+        self._created = 0
+        self._reused = 0
+
+    def get_client(self, base_url, model, api_key, temperature=0.1, **kwargs):
+        """Return a shared ChatOpenAI client, creating it on first use.
+
+        Args:
+            base_url: OpenAI-compatible endpoint URL
+            model: Model name
+            api_key: API key for the endpoint
+            temperature: Sampling temperature
+            **kwargs: Extra ChatOpenAI arguments (part of the cache key)
+
+        Returns:
+            ChatOpenAI: A client backed by the endpoint's shared connection pool
+        """
+        key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        key = (base_url, model, temperature, key_hash, tuple(sorted(kwargs.items())))
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle_locked(now)
+            self._last_used[base_url] = now
+
+            client = self._clients.get(key)
+            if client is not None:
+                self._reused += 1
+                return client
+
+            pools = self._pools.get(base_url)
+            if pools is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                )
+                pools = (httpx.Client(limits=limits),
+                         httpx.AsyncClient(transport=LoopLocalAsyncTransport(limits=limits)))
+                self._pools[base_url] = pools
+
+            sync_pool, async_pool = pools
+            client = ChatOpenAI(
+                model=model,
+                api_key=api_key,
+                base_url=base_url,
+                temperature=temperature,
+                http_client=sync_pool,
+                http_async_client=async_pool,
+                **kwargs
+            )
+            self._clients[key] = client
+            self._created += 1
+            return client
+
+    def evict_idle(self):
+        """Drop endpoints (and their clients) that have not been used within idle_timeout.
+
+        Returns:
+            int: Number of endpoints evicted
+        """
+        with self._lock:
+            return self._evict_idle_locked(time.monotonic())
+
+    def _evict_idle_locked(self, now):
+        expired = [url for url, last in self._last_used.items() if now - last > self.idle_timeout]
+        for base_url in expired:
+            # Not closed: clients handed out earlier may still be using the pools
+            self._pools.pop(base_url, None)
+            self._last_used.pop(base_url, None)
+            for key in [k for k in self._clients if k[0] == base_url]:
+                del self._clients[key]
+        return len(expired)
+
+    def stats(self):
+        """Get registry statistics.
+
+        Returns:
+            dict: Number of endpoints, clients, and created/reused client counts
+        """
+        with self._lock:
+            return {
+                'endpoints': len(self._pools),
+                'clients': len(self._clients),
+                'created': self._created,
+                'reused': self._reused,
+            }
+
+    def close(self):
+        """Close every sync connection pool and forget all clients.
+
+        Async pools are bound to their event loops and are released with them.
+        """
+        with self._lock:
+            for sync_pool, _ in self._pools.values():
+                sync_pool.close()
+            self._pools.clear()
+            self._clients.clear()
+            self._last_used.clear()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_client_registry():
+    """Get the process-wide LLM client registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+    return _registry
+
 def is_openrouter_configured():
     """Check if OpenRouter is properly configured"""
     return bool(os.getenv("OPENROUTER_API_KEY"))
 
 def configure_llm():
-    """Configure the LLM with OpenRouter or local Ollama settings"""
+    """Configure the LLM with OpenRouter or local Ollama settings.
+
+    Returns a shared client from the process-wide registry, so calling this per
+    request is cheap and reuses the endpoint's keep-alive connections. When
+    LLM_CACHE_PATH is set, responses are served from the persistent cache.
+    """
+    registry = get_client_registry()
+
+    # Attach the persistent response cache when LLM_CACHE_PATH is configured
+    cache = get_response_cache()
+    cache_kwargs = {'cache': cache} if cache is not None else {}
+
     # Check if OpenRouter configuration is available
     if is_openrouter_configured():
-        return ChatOpenAI(
+        return registry.get_client(
             api_key=os.getenv("OPENROUTER_API_KEY"),
             base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
             model=os.getenv("MODEL_NAME", "openai/gpt-4.1-nano"),
-            temperature=0.1  # Lower temperature for more consistent math
+            temperature=0.1,  # Lower temperature for more consistent math
+            **cache_kwargs
         )
     else:
-        # Fallback to local Ollama
-        return ChatOpenAI(
-            model="mistral",
-            api_key="ollama",
-            base_url="http://localhost:11434/v1",
-            temperature=0.1
-        )
\ No newline at end of file
+        # Fallback to local Ollama (or any OpenAI-compatible server, e.g. helpers/mock_llm_server.py)
+        return registry.get_client(
+            model=os.getenv("OLLAMA_DEFAULT_MODEL", "mistral"),
+            api_key=os.getenv("OLLAMA_API_KEY", "ollama"),
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
+            temperature=0.1,
+            **cache_kwargs
+        )
+
+async def aconfigure_llm():
+    """Async version of configure_llm.
+
+    The first call for an endpoint constructs the client, so the lookup runs in a
+    worker thread to keep the event loop responsive.
+    """
+    return await asyncio.to_thread(configure_llm)
@@ -0,0 +1,136 @@
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Compaction defaults
+DEFAULT_KEEP_TURNS = 2      # Most recent model turns kept verbatim
+DEFAULT_MAX_TOKENS = 0      # Prompt token budget; 0 disables the budget
+
+# Rough token estimate used for the budget (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+
+# First line of the message that replaces collapsed tool calls
+SCRATCHPAD_HEADER = "Scratchpad (completed tool calls):"
+
+def estimate_tokens(messages):
+    """Estimate the prompt size of a list of messages.
+
+    Args:
+        messages: LangChain messages
+
+    Returns:
+        int: Approximate token count (characters / CHARS_PER_TOKEN)
+    """
+    chars = 0
+    for message in messages:
+        chars += len(message.content) if isinstance(message.content, str) else len(str(message.content))
+        for tool_call in getattr(message, 'tool_calls', None) or []:
+            chars += len(tool_call['name']) + len(str(tool_call['args']))
+    return chars // CHARS_PER_TOKEN + len(messages)
+
+def format_tool_step(tool_call, result):
+    """Format a tool call and its result as a scratchpad line, e.g. "add(15,25)=40" """
+    args = tool_call.get('args') or {}
+    values = args.values() if isinstance(args, dict) else [args]
+    return f"{tool_call['name']}({','.join(str(value) for value in values)})={result}"
+
+def _split_turns(messages):
+    """Split messages into (head, turns).
+
+    The head is every message before the first model turn (system prompt and
+    the user's request). Each turn is an AIMessage followed by the
+    ToolMessages answering it; any other message starts a turn of its own.
+    """
+    start = next((i for i, message in enumerate(messages) if isinstance(message, AIMessage)), len(messages))
+    head, turns = list(messages[:start]), []
+    for message in messages[start:]:
+        if isinstance(message, ToolMessage) and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return head, turns
+
+def _collapse_turn(turn):
+    """Scratchpad lines for a completed tool turn, or None if it cannot be collapsed"""
+    ai_message = turn[0]
+    if not isinstance(ai_message, AIMessage) or not ai_message.tool_calls:
+        return None
+    results = {message.tool_call_id: message.content for message in turn[1:]}
+    if any(tool_call.get('id') not in results for tool_call in ai_message.tool_calls):
+        return None  # Still waiting for results
+    return [format_tool_step(tool_call, results[tool_call['id']]) for tool_call in ai_message.tool_calls]
+
+def compact_messages(messages, keep_turns=DEFAULT_KEEP_TURNS, max_tokens=DEFAULT_MAX_TOKENS):
+    """Compact an agent's message history before a model call.
+
+    System messages and the user's request are kept, as are the last
+    keep_turns model turns. Older completed tool turns are collapsed into one
+    scratchpad message ("add(15,25)=40" per call). If the result is still over
+    max_tokens, the oldest scratchpad lines and then older verbatim turns are
+    dropped; the head and the latest turn are always kept.
+
+    Args:
+        messages: The full message history
+        keep_turns: Number of most recent model turns kept verbatim
+        max_tokens: Token budget for the compacted history (0 = no budget)
+
+    Returns:
+        list: The compacted messages (the input list is not modified)
+    """
+    head, turns = _split_turns(messages)
+    keep_turns = max(keep_turns, 1)
+    if len(turns) <= keep_turns and not max_tokens:
+        return list(messages)
+
+    # Older turns become scratchpad segments (runs of completed tool turns) or
+    # stay verbatim (anything else, e.g. a follow-up question)
+    segments = []
+    for turn in turns[:-keep_turns]:
+        lines = _collapse_turn(turn)
+        if lines is None:
+            segments.append(('turn', turn))
+        elif segments and segments[-1][0] == 'scratchpad':
+            segments[-1][1].extend(lines)
+        else:
+            segments.append(('scratchpad', lines))
+    segments.extend(('turn', turn) for turn in turns[-keep_turns:])
+
+    def build():
+        compacted = list(head)
+        for kind, content in segments:
+            if kind == 'turn':
+                compacted.extend(content)
+            elif content:
+                compacted.append(AIMessage(content="\n".join([SCRATCHPAD_HEADER] + content)))
+        return compacted
+
+    compacted = build()
+    if not max_tokens:
+        return compacted
+
+    # Enforce the budget: drop the oldest scratchpad lines, then the oldest verbatim turns
+    while estimate_tokens(compacted) > max_tokens:
+        scratchpad = next((content for kind, content in segments if kind == 'scratchpad' and content), None)
+        if scratchpad:
+            scratchpad.pop(0)
+        elif sum(1 for kind, _ in segments if kind == 'turn') > 1:
+            segments.pop(next(i for i, (kind, _) in enumerate(segments) if kind == 'turn'))
+        else:
+            break
+        compacted = build()
+    return compacted
+
+def make_compaction_hook(keep_turns=DEFAULT_KEEP_TURNS, max_tokens=DEFAULT_MAX_TOKENS):
+    """Build a pre_model_hook for create_react_agent that compacts the history.
+
+    The compacted messages are only sent to the model; the graph state keeps
+    the full history.
+
+    Args:
+        keep_turns: Number of most recent model turns kept verbatim
+        max_tokens: Token budget for the compacted history (0 = no budget)
+
+    Returns:
+        callable: Hook returning {"llm_input_messages": [...]}
+    """
+    def compaction_hook(state):
+        return {"llm_input_messages": compact_messages(state["messages"], keep_turns, max_tokens)}
+    return compaction_hook
@@ -0,0 +1,479 @@
+"""
+Offline OpenAI-compatible stand-in server
+
+Speaks enough of the OpenAI chat-completions protocol (plain and streaming
+responses, tool calls) to drive the examples without a live model:
+
+- Calculator queries get one evaluate_expression call when that tool is
+  offered, otherwise correct add/subtract/multiply/divide tool calls, one
+  step per turn (or all independent steps at once with parallel_tool_calls),
+  followed by a "The result is X." answer
+- Plan-and-execute planners (a "Plan" tool) get the calculation as a plan of
+  tool steps that reference earlier results as "$sN"
+- The expression extraction prompt gets the bare expression back
+- The agent controller prompt gets a keyword-based SELECTED_AGENT decision
+- Anything else gets a short canned reply, unless a script rule matches first
+
+Time-to-first-token, tokens/second and the number of requests served at once
+are configurable, so benchmarks measure framework overhead reproducibly and
+separately from model speed.
+
+Usage:
+    python -m helpers.mock_llm_server --port 8099 --ttft 0.2 --tokens-per-second 50
+    export OLLAMA_BASE_URL=http://127.0.0.1:8099/v1
+"""
+
+import argparse
+import ast
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .message_compaction import SCRATCHPAD_HEADER
+
+# Tool names emitted for each binary operator
+OPERATOR_TOOLS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "divide",
+}
+
+# Word forms rewritten to operators before looking for an expression
+WORD_OPERATORS = [
+    (re.compile(r'\bsubtract\s+(\d+(?:\.\d+)?)\s+from\s+(\d+(?:\.\d+)?)', re.IGNORECASE), r'\2 - \1'),
+    (re.compile(r'\bdivided\s+by\b', re.IGNORECASE), '/'),
+    (re.compile(r'\b(?:times|multiplied\s+by)\b', re.IGNORECASE), '*'),
+    (re.compile(r'\bplus\b', re.IGNORECASE), '+'),
+    (re.compile(r'\bminus\b', re.IGNORECASE), '-'),
+]
+
+# Tool that evaluates a whole expression in one call
+EXPRESSION_TOOL = "evaluate_expression"
+
+# Structured-output tool used by plan-and-execute agents to submit a plan
+PLAN_TOOL = "Plan"
+
+EXPRESSION_PATTERN = re.compile(r'[\d.(][\d.\s+\-*/()]*')
+
+# Keywords used to answer agent controller prompts
+ROUTING_KEYWORDS = {
+    "Dr. Code": ["code", "programming", "python", "javascript", "algorithm", "debug", "function", "binary search"],
+    "Creative Writer": ["story", "poem", "creative", "write", "fiction", "tale", "magical"],
+    "Business Analyst": ["business", "market", "strategy", "revenue", "company", "competitive", "launch"],
+    "Witty Comedian": ["joke", "funny", "laugh", "humor", "comedy"],
+}
+
+def find_expression(text):
+    """Find the arithmetic expression in a piece of text.
+
+    Args:
+        text: Query text such as "Compute 1024 divided by 8"
+
+    Returns:
+        str or None: The expression (e.g. "1024 / 8"), or None if none was found
+    """
+    for pattern, replacement in WORD_OPERATORS:
+        text = pattern.sub(replacement, text)
+
+    candidates = []
+    for match in EXPRESSION_PATTERN.finditer(text):
+        candidate = match.group(0).strip().rstrip('.').strip()
+        try:
+            ast.parse(candidate, mode='eval')
+        except SyntaxError:
+            continue
+        if any(op in candidate for op in '+-*/'):
+            candidates.append(candidate)
+    return max(candidates, key=len) if candidates else None
+
+def plan_tool_steps(expression):
+    """Turn an expression into binary tool steps in evaluation order.
+
+    Args:
+        expression: Arithmetic expression using + - * / and parentheses
+
+    Returns:
+        list: Steps as dicts with 'tool', 'args', 'value', 'level' (dependency depth)
+        and 'inputs' (index of the step producing each argument, or None for
+        literals), or an empty list if the expression uses anything else
+    """
+    steps = []
+
+    def visit(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value, -1, None
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            # A negated step result is passed on as a literal
+            value, level, _ = visit(node.operand)
+            return -value, level, None
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATOR_TOOLS:
+            left, left_level, left_source = visit(node.left)
+            right, right_level, right_source = visit(node.right)
+            op = type(node.op)
+            value = {ast.Add: left + right, ast.Sub: left - right,
+                     ast.Mult: left * right, ast.Div: left / right if right else float('nan')}[op]
+            level = max(left_level, right_level) + 1
+            steps.append({'tool': OPERATOR_TOOLS[op], 'args': {'a': left, 'b': right},
+                          'value': value, 'level': level,
+                          'inputs': {'a': left_source, 'b': right_source}})
+            return value, level, len(steps) - 1
+        raise ValueError(f"Unsupported node: {type(node).__name__}")
+
+    try:
+        visit(ast.parse(expression, mode='eval').body)
+    except (SyntaxError, ValueError):
+        return []
+    return steps
+
+def plan_from_steps(steps):
+    """Express tool steps as a Plan tool call whose arguments reference earlier steps as "$sN" """
+    plan = []
+    for index, step in enumerate(steps):
+        args = {name: f"$s{step['inputs'][name] + 1}" if step['inputs'][name] is not None else value
+                for name, value in step['args'].items()}
+        plan.append({'id': f"s{index + 1}", 'tool': step['tool'], 'args': args})
+    return {'steps': plan}
+
+def completed_tool_calls(messages):
+    """Count the tool calls already answered in a conversation.
+
+    Tool results count one each, and so do the lines of a compacted history
+    scratchpad (see helpers.message_compaction), which replace older calls.
+    """
+    completed = 0
+    for message in messages:
+        content = message.get('content')
+        if message.get('role') == 'tool':
+            completed += 1
+        elif message.get('role') == 'assistant' and isinstance(content, str) and content.startswith(SCRATCHPAD_HEADER):
+            completed += len(content.splitlines()) - 1
+    return completed
+
+def format_number(value):
+    """Format a number the way a model would write it in an answer"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+class StandInModel:
+    """Rule-based stand-in for a chat model.
+
+    Args:
+        script: Optional list of rules {"match": regex, "response": text} or
+            {"match": regex, "tool_calls": [{"name": ..., "args": {...}}]}, checked
+            against the last user message before the built-in rules
+        parallel_tool_calls: Emit every independent calculator step in one turn
+    """
+
+    def __init__(self, script=None, parallel_tool_calls=False):
+        self.script = [(re.compile(rule['match'], re.IGNORECASE), rule) for rule in (script or [])]
+        self.parallel_tool_calls = parallel_tool_calls
+
+    def respond(self, messages, tools=None):
+        """Produce a reply for a chat-completions request.
+
+        Returns:
+            tuple: (content text, list of tool calls as {'name', 'args'})
+        """
+        tool_names = {tool.get('function', {}).get('name') for tool in (tools or [])}
+        user_text = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+        if isinstance(user_text, list):
+            user_text = ' '.join(part.get('text', '') for part in user_text if isinstance(part, dict))
+
+        for pattern, rule in self.script:
+            if pattern.search(user_text):
+                return rule.get('response', ''), rule.get('tool_calls', [])
+
+        if 'SELECTED_AGENT' in user_text:
+            return self._route(user_text), []
+
+        if 'Mathematical expression:' in user_text:
+            query = re.search(r'Query: "(.*)"', user_text)
+            expression = find_expression(query.group(1) if query else user_text)
+            return expression or "NONE", []
+
+        if PLAN_TOOL in tool_names:
+            expression = find_expression(user_text)
+            steps = plan_tool_steps(expression) if expression else []
+            return "", [{'name': PLAN_TOOL, 'args': plan_from_steps(steps)}]
+
+        if tool_names & (set(OPERATOR_TOOLS.values()) | {EXPRESSION_TOOL}):
+            return self._calculate(user_text, messages, tool_names)
+
+        return f"This is a simulated response to: {user_text[:200]}", []
+
+    def _calculate(self, user_text, messages, tool_names):
+        expression = find_expression(user_text)
+        steps = plan_tool_steps(expression) if expression else []
+        if not steps:
+            return "I could not find a calculation in your request.", []
+
+        # Progress is derived from the conversation, so the server stays stateless
+        completed = completed_tool_calls(messages)
+        if EXPRESSION_TOOL in tool_names:
+            if not completed:
+                return "", [{'name': EXPRESSION_TOOL, 'args': {'expression': expression}}]
+            return f"The result of {expression} is {format_number(steps[-1]['value'])}.", []
+        if self.parallel_tool_calls:
+            # Each turn completes one dependency level
+            levels_done, counted = 0, 0
+            level_sizes = [sum(1 for step in steps if step['level'] == level)
+                           for level in range(max(step['level'] for step in steps) + 1)]
+            while levels_done < len(level_sizes) and counted + level_sizes[levels_done] <= completed:
+                counted += level_sizes[levels_done]
+                levels_done += 1
+            pending = [step for step in steps if step['level'] == levels_done]
+        else:
+            pending = steps[completed:completed + 1]
+        pending = [step for step in pending if step['tool'] in tool_names]
+
+        if pending:
+            return "", [{'name': step['tool'], 'args': step['args']} for step in pending]
+        return f"The result of {expression} is {format_number(steps[-1]['value'])}.", []
+
+    def _route(self, prompt):
+        query_match = re.search(r'QUERY TO ROUTE:\s*(.*)', prompt)
+        query = (query_match.group(1) if query_match else prompt).lower()
+        scores = {name: sum(1 for keyword in keywords if keyword in query)
+                  for name, keywords in ROUTING_KEYWORDS.items()}
+        selected = max(scores, key=scores.get) if max(scores.values()) > 0 else "Dr. Code"
+        return (f"SELECTED_AGENT: {selected}\n"
+                f"REASONING: The query best matches the {selected} specialties.")
+
+class MockLLMServer:
+    """Threaded OpenAI-compatible HTTP server around a StandInModel.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        ttft: Simulated time to first token, in seconds
+        tokens_per_second: Simulated generation speed (0 disables throttling)
+        max_concurrency: Requests generated at once; extra requests queue (0 = unlimited)
+        model: StandInModel instance (default: built-in rules only)
+    """
+
+    def __init__(self, host="127.0.0.1", port=8099, ttft=0.0, tokens_per_second=0.0,
+                 max_concurrency=0, model=None):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.model = model or StandInModel()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'streamed': 0, 'tool_call_responses': 0,
+                       'completion_tokens': 0, 'simulated_seconds': 0.0, 'queued_seconds': 0.0}
+        self._thread = None
+
+        server = self
+
+        class Handler(_ChatCompletionsHandler):
+            mock_server = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        """OpenAI-compatible base URL of the running server"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve requests from a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """Get request counters and the total simulated model time"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _record(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    mock_server = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json({'object': 'list', 'data': [{'id': 'stand-in', 'object': 'model', 'owned_by': 'local'}]})
+        elif self.path.rstrip('/').endswith('/stats'):
+            self._send_json(self.mock_server.stats())
+        else:
+            self._send_json({'error': {'message': f"Unknown path {self.path}"}}, status=404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json({'error': {'message': f"Unknown path {self.path}"}}, status=404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            self._send_json({'error': {'message': f"Invalid JSON: {e}"}}, status=400)
+            return
+
+        server = self.mock_server
+        queued_at = time.monotonic()
+        if server._slots:
+            server._slots.acquire()
+        try:
+            server._record(requests=1, queued_seconds=time.monotonic() - queued_at)
+            content, tool_calls = server.model.respond(request.get('messages', []), request.get('tools'))
+            if request.get('stream'):
+                self._stream_completion(request, content, tool_calls)
+            else:
+                self._send_completion(request, content, tool_calls)
+        finally:
+            if server._slots:
+                server._slots.release()
+
+    def _tokens(self, content):
+        return re.findall(r'\S+\s*|\s+', content)
+
+    def _tool_call_payload(self, tool_calls):
+        return [{
+            'id': f"call_{uuid.uuid4().hex[:12]}",
+            'type': 'function',
+            'function': {'name': call['name'], 'arguments': json.dumps(call.get('args', {}))},
+        } for call in tool_calls]
+
+    def _usage(self, request, completion_tokens):
+        prompt_text = json.dumps(request.get('messages', []))
+        prompt_tokens = max(1, len(prompt_text) // 4)
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    def _send_completion(self, request, content, tool_calls):
+        server = self.mock_server
+        tool_payload = self._tool_call_payload(tool_calls)
+        n_tokens = len(self._tokens(content)) + sum(len(c['function']['arguments']) // 4 + 1 for c in tool_payload)
+        delay = server.ttft + (n_tokens / server.tokens_per_second if server.tokens_per_second else 0.0)
+        time.sleep(delay)
+        server._record(simulated_seconds=delay, completion_tokens=n_tokens,
+                       tool_call_responses=1 if tool_calls else 0)
+
+        message = {'role': 'assistant', 'content': content or None}
+        if tool_payload:
+            message['tool_calls'] = tool_payload
+        try:
+            self._send_json({
+                'id': f"chatcmpl-{uuid.uuid4().hex}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'stand-in'),
+                'choices': [{'index': 0, 'message': message,
+                             'finish_reason': 'tool_calls' if tool_payload else 'stop'}],
+                'usage': self._usage(request, n_tokens),
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Client gave up before the response was ready
+
+    def _stream_completion(self, request, content, tool_calls):
+        server = self.mock_server
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        base = {'id': completion_id, 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': request.get('model', 'stand-in')}
+
+        def send(delta, finish_reason=None, **extra):
+            chunk = dict(base, choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}], **extra)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        token_delay = 1.0 / server.tokens_per_second if server.tokens_per_second else 0.0
+        started = time.monotonic()
+        n_tokens = 0
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            time.sleep(server.ttft)
+            send({'role': 'assistant', 'content': ''})
+            for token in self._tokens(content):
+                time.sleep(token_delay)
+                send({'content': token})
+                n_tokens += 1
+            for index, call in enumerate(self._tool_call_payload(tool_calls)):
+                time.sleep(token_delay)
+                send({'tool_calls': [dict(call, index=index)]})
+                n_tokens += len(call['function']['arguments']) // 4 + 1
+            send({}, finish_reason='tool_calls' if tool_calls else 'stop')
+            if (request.get('stream_options') or {}).get('include_usage'):
+                self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=self._usage(request, n_tokens)))}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the generation
+        server._record(streamed=1, completion_tokens=n_tokens, simulated_seconds=time.monotonic() - started,
+                       tool_call_responses=1 if tool_calls else 0)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def main():
+    """Run the stand-in server from the command line"""
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8099, help="Port to bind")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Simulated time to first token (seconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated generation speed (0 = unthrottled)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Requests generated at once (0 = unlimited)")
+    parser.add_argument("--script", help="JSON file with a list of scripted {match, response|tool_calls} rules")
+    parser.add_argument("--parallel-tool-calls", action="store_true", help="Emit all independent tool calls in one turn")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        max_concurrency=args.max_concurrency,
+        model=StandInModel(script=script, parallel_tool_calls=args.parallel_tool_calls),
+    )
+    print(f"🧪 Stand-in LLM server listening on {server.base_url}")
+    print(f"   TTFT: {args.ttft}s, tokens/s: {args.tokens_per_second or 'unthrottled'}, "
+          f"max concurrency: {args.max_concurrency or 'unlimited'}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping stand-in server")
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
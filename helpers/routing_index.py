@@ -0,0 +1,95 @@
+import re
+
+# Words of a lowercased query
+_WORD = re.compile(r"\w+")
+
+# Inflectional endings a keyword also matches with ("debug" -> "debugging").
+# Only whole inflected words match, so "class" does not hit "classic"
+SUFFIXES = ('s', 'es', 'ed', 'ing', 'er')
+
+_VOWELS = set('aeiou')
+
+class RoutingIndex:
+    """Keyword routing index compiled into one hash table of word forms.
+
+    Every keyword and its inflections (the SUFFIXES, with "y" -> "ies"/"ied",
+    a dropped final "e" and a doubled final consonant: "debug" -> "debugging")
+    is stored as a space-joined word sequence. A query is split into words
+    once, and its words (and word pairs, triples... up to the longest keyword)
+    are looked up in the table, so scoring costs one pass over the query
+    however many routes and keywords there are. Keywords only match whole
+    words: "fun" does not hit "function", nor "class" "classic".
+
+    A route's score is the number of its distinct keywords found in the query,
+    as with the `keyword in query` counting it replaces. A multi-word keyword
+    also credits the keywords it contains ("creative writing" counts
+    "creative" too).
+
+    Args:
+        keywords_by_route: Dict of route -> list of keywords
+    """
+
+    def __init__(self, keywords_by_route):
+        self.routes = list(keywords_by_route)
+        self._routes_by_keyword = {}  # keyword -> routes it scores for
+        for route, keywords in keywords_by_route.items():
+            for keyword in keywords:
+                routes = self._routes_by_keyword.setdefault(' '.join(_WORD.findall(keyword.lower())), [])
+                if route not in routes:
+                    routes.append(route)
+
+        # Surface form (keyword or inflection, as a space-joined word sequence) -> keywords it credits
+        self._credits = {}
+        for keyword in self._routes_by_keyword:
+            words = keyword.split()
+            contained = [other for other in self._routes_by_keyword
+                         if other != keyword and self._contains(words, other.split())]
+            for form in self._forms(words):
+                self._credits.setdefault(form, set()).update([keyword, *contained])
+        self._credits = {form: frozenset(keywords) for form, keywords in self._credits.items()}
+        self._single_words = {form for form in self._credits if ' ' not in form}
+        self._max_words = max((form.count(' ') + 1 for form in self._credits), default=1)
+
+    @staticmethod
+    def _contains(words, other):
+        size = len(other)
+        return any(words[i:i + size] == other for i in range(len(words) - size + 1))
+
+    @staticmethod
+    def _forms(words):
+        *head, last = words
+        endings = {last, *(last + suffix for suffix in SUFFIXES)}
+        if last.endswith('y'):
+            endings.update(last[:-1] + ending for ending in ('ies', 'ied', 'ier'))
+        elif last.endswith('e'):
+            endings.update(last[:-1] + suffix for suffix in SUFFIXES if suffix != 's')
+        elif (len(last) > 2 and last[-1] not in _VOWELS | set('wxy')
+              and last[-2] in _VOWELS and last[-3] not in _VOWELS):
+            endings.update(last + last[-1] + suffix for suffix in ('ed', 'ing', 'er'))
+        return {' '.join([*head, ending]) for ending in endings}
+
+    def matches(self, query):
+        """Distinct keywords found in the query"""
+        words = _WORD.findall(query.lower())
+        hits = self._single_words.intersection(words)
+        for size in range(2, self._max_words + 1):
+            hits.update(form for form in (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+                        if form in self._credits)
+        if not hits:
+            return frozenset()
+        return frozenset().union(*map(self._credits.__getitem__, hits))
+
+    def scores(self, query):
+        """Score every route in one pass over the query.
+
+        Args:
+            query: Query text
+
+        Returns:
+            dict: route -> number of its keywords found (every route is present)
+        """
+        scores = dict.fromkeys(self.routes, 0)
+        for keyword in self.matches(query):
+            for route in self._routes_by_keyword[keyword]:
+                scores[route] += 1
+        return scores
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.tools import StructuredTool
+from .tool_tracker import current_tracker
+
+# Memo defaults (overridable through the TOOL_MEMO_* environment variables)
+DEFAULT_MEMO_MAX_ENTRIES = 4096
+DEFAULT_MEMO_TTL = 0    # Seconds a result stays valid (the cache window); 0 = until evicted
+
+def canonical_args(args):
+    """Serialize tool arguments so equal inputs produce the same key"""
+    return json.dumps(args, sort_keys=True, separators=(',', ':'), default=str)
+
+class ToolMemoCache:
+    """Bounded LRU cache of tool results, keyed on tool identity, name and canonical args.
+
+    Args:
+        max_entries: Maximum number of results kept; least recently used are evicted
+        ttl: Seconds a result stays valid (0 = until evicted)
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_MAX_ENTRIES, ttl=DEFAULT_MEMO_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (result, stored_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    def get(self, key):
+        """Get (True, result) for a live entry, or (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[0]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evicted'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss counters, hit rate and entry count"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+_memo_cache = None
+_memo_cache_lock = threading.Lock()
+
+def get_tool_memo_cache():
+    """Get the process-wide tool memo cache"""
+    global _memo_cache
+    if _memo_cache is None:
+        with _memo_cache_lock:
+            if _memo_cache is None:
+                _memo_cache = ToolMemoCache(
+                    max_entries=int(os.getenv("TOOL_MEMO_MAX_ENTRIES", DEFAULT_MEMO_MAX_ENTRIES)),
+                    ttl=float(os.getenv("TOOL_MEMO_TTL", DEFAULT_MEMO_TTL)),
+                )
+    return _memo_cache
+
+def is_pure(tool):
+    """Whether a tool is marked pure (same input, same result, no side effects)"""
+    return bool((tool.metadata or {}).get('pure'))
+
+def _record(cache, hit):
+    tracker = current_tracker.get()
+    if tracker is not None:
+        # Parallel tool calls of one run share its tracker, so count under the cache's lock
+        with cache._lock:
+            tracker.record_memo(hit)
+
+def memoize_tool(tool, pure=None, cache=None, namespace=None, is_error=None):
+    """Wrap a tool so identical calls are answered from a shared LRU cache.
+
+    Only pure tools are memoized; anything else is returned unchanged. Errors
+    are never cached: a raised exception (e.g. ToolException) skips the cache,
+    and so does any result that is_error flags. Hits and misses are counted on
+    the ToolTracker of the current run (see tool_tracker.current_tracker).
+
+    Results are keyed on the tool's function as well as its name, so two tools
+    that share a name (e.g. the same tool built for two MCP servers) never
+    answer for each other.
+
+    Args:
+        tool: A LangChain tool (e.g. from @tool)
+        pure: Override the tool's purity flag (default: tool.metadata['pure'])
+        cache: ToolMemoCache to use (default: the process-wide cache)
+        namespace: Key results on this value instead of the tool's function,
+            e.g. to share results between wrappers of the same server
+        is_error: Predicate on a result; results it returns True for are not cached
+
+    Returns:
+        The memoizing tool, or the original tool if it is not pure
+    """
+    if not (is_pure(tool) if pure is None else pure):
+        return tool
+    cache = cache or get_tool_memo_cache()
+    name = tool.name
+    source = namespace if namespace is not None else (tool.func or tool.coroutine)
+
+    def lookup(kwargs):
+        key = (source, name, canonical_args(kwargs))
+        hit, result = cache.get(key)
+        _record(cache, hit)
+        return key, hit, result
+
+    def store(key, result):
+        if is_error is None or not is_error(result):
+            cache.put(key, result)
+
+    def memoized(**kwargs):
+        key, hit, result = lookup(kwargs)
+        if not hit:
+            result = tool.func(**kwargs)
+            store(key, result)
+        return result
+
+    async def amemoized(**kwargs):
+        key, hit, result = lookup(kwargs)
+        if not hit:
+            result = await tool.coroutine(**kwargs) if tool.coroutine else tool.func(**kwargs)
+            store(key, result)
+        return result
+
+    return StructuredTool.from_function(
+        func=memoized if tool.func else None,
+        coroutine=amemoized,
+        name=name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        handle_tool_error=tool.handle_tool_error,
+        metadata=dict(tool.metadata or {}, pure=True, memoized=True),
+    )
+
+def memoize_tools(tools, cache=None, is_error=None):
+    """Memoize every pure tool in a list (see memoize_tool)"""
+    return [memoize_tool(tool, cache=cache, is_error=is_error) for tool in tools]
@@ -0,0 +1,229 @@
+import json
+import time
+import logging
+from collections import deque
+from contextvars import ContextVar
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Tracker of the run executing in the current context (set by run_calculation),
+# so tool wrappers can report to it without being passed the tracker
+current_tracker = ContextVar('current_tracker', default=None)
+
+class ToolCallRecord:
+    """A single tool call and (once it arrives) its result.
+
+    Attributes:
+        call_id: The tool_call_id linking the call to its ToolMessage
+        name: Tool name
+        args: Tool arguments
+        node: Graph node that issued the call
+        result: Tool result content (None while pending)
+        started_at: time.perf_counter() when the call was seen
+        finished_at: time.perf_counter() when the result was seen (None while pending)
+    """
+
+    __slots__ = ('call_id', 'name', 'args', 'node', 'result', 'started_at', 'finished_at')
+
+    def __init__(self, call_id, name, args, node=None):
+        self.call_id = call_id
+        self.name = name
+        self.args = args
+        self.node = node
+        self.result = None
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    @property
+    def pending(self):
+        return self.finished_at is None
+
+    @property
+    def duration(self):
+        """Seconds between the call and its result, or None while pending"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self):
+        return {
+            'call_id': self.call_id,
+            'name': self.name,
+            'args': self.args,
+            'node': self.node,
+            'result': self.result,
+            'duration': self.duration,
+        }
+
+class PrintSink:
+    """Sink that prints tool results to the console as they arrive"""
+
+    def on_call(self, record):
+        pass
+
+    def on_result(self, record):
+        args = '...' if record.args is None else record.args
+        print(f"🛠️  {record.name}({args}) -> {record.result}")
+
+    def on_invalid_call(self, node, invalid_call):
+        print(f"\n❌ Invalid Tool Calls from {node}:")
+        print(f"   🚫 {invalid_call['name']}: {invalid_call.get('error', 'Invalid format')}")
+
+class LogSink:
+    """Sink that emits one structured (JSON) log record per tool event.
+
+    Args:
+        logger: Logger to write to (default: the "helpers.tool_tracker" logger)
+        level: Logging level for the records
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("helpers.tool_tracker")
+        self.level = level
+
+    def _emit(self, payload):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, json.dumps(payload, default=str))
+
+    def on_call(self, record):
+        self._emit({'event': 'tool_call', 'call_id': record.call_id, 'name': record.name,
+                    'args': record.args, 'node': record.node})
+
+    def on_result(self, record):
+        self._emit(dict(record.to_dict(), event='tool_result'))
+
+    def on_invalid_call(self, node, invalid_call):
+        self._emit({'event': 'invalid_tool_call', 'node': node, 'name': invalid_call.get('name'),
+                    'error': invalid_call.get('error')})
+
+class ToolTracker:
+    """Tracks tool calls and results streamed from an agent run.
+
+    Calls are keyed by tool_call_id, so each result is matched to its call in
+    O(1) and repeated calls to the same tool are never mis-paired. Events are
+    forwarded to the given sinks; with no sinks the tracker only records in memory.
+
+    Args:
+        sinks: Objects with on_call/on_result/on_invalid_call methods (e.g. PrintSink, LogSink)
+    """
+
+    __slots__ = ('sinks', '_records', '_pending_by_name', 'invalid_calls', 'orphan_results', 'last_result',
+                 'memo_hits', 'memo_misses')
+
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self._records = {}          # call_id -> ToolCallRecord, in call order
+        self._pending_by_name = {}  # name -> deque of pending call_ids (for results without an id)
+        self.invalid_calls = []
+        self.orphan_results = []    # ToolCallRecords for results whose call was never seen
+        self.last_result = None
+        self.memo_hits = 0          # Tool calls answered by a memoized tool's cache
+        self.memo_misses = 0
+
+    @property
+    def calls(self):
+        """All tool call records, in the order the calls were made"""
+        return list(self._records.values())
+
+    @property
+    def results(self):
+        """Records that have received their result"""
+        return [record for record in self._records.values() if not record.pending] + self.orphan_results
+
+    @property
+    def pending(self):
+        """Records still waiting for a result"""
+        return [record for record in self._records.values() if record.pending]
+
+    @property
+    def tools_used(self):
+        return bool(self.results)
+
+    @property
+    def total_tool_time(self):
+        """Sum of the durations of all completed calls, in seconds"""
+        return sum(record.duration for record in self._records.values() if not record.pending)
+
+    def record_call(self, tool_call, node=None):
+        """Record a tool call requested by the model.
+
+        Args:
+            tool_call: Tool call dict with 'name', 'args' and (usually) 'id'
+            node: Graph node that issued the call
+
+        Returns:
+            ToolCallRecord: The new record
+        """
+        call_id = tool_call.get('id') or f"{tool_call['name']}_{len(self._records)}"
+        record = ToolCallRecord(call_id, tool_call['name'], tool_call.get('args'), node)
+        self._records[call_id] = record
+        self._pending_by_name.setdefault(record.name, deque()).append(call_id)
+        for sink in self.sinks:
+            sink.on_call(record)
+        return record
+
+    def record_result(self, message):
+        """Record a ToolMessage result and match it to its call.
+
+        Args:
+            message: The ToolMessage returned by the tool node
+
+        Returns:
+            ToolCallRecord: The matched (or orphan) record
+        """
+        record = self._records.get(message.tool_call_id)
+        if record is not None and record.pending:
+            # Pending ids are removed lazily; drop this one now if it is at the front
+            pending_ids = self._pending_by_name.get(record.name)
+            if pending_ids and pending_ids[0] == record.call_id:
+                pending_ids.popleft()
+        else:
+            # Fallback: oldest pending call with the same name
+            record = None
+            pending_ids = self._pending_by_name.get(message.name)
+            while pending_ids and record is None:
+                candidate = self._records[pending_ids.popleft()]
+                if candidate.pending:
+                    record = candidate
+
+        if record is None:
+            record = ToolCallRecord(message.tool_call_id, message.name, None)
+            self.orphan_results.append(record)
+
+        record.result = message.content
+        record.finished_at = time.perf_counter()
+        self.last_result = message.content
+        for sink in self.sinks:
+            sink.on_result(record)
+        return record
+
+    def record_memo(self, hit):
+        """Count a memoized tool lookup (see helpers.tool_memo)"""
+        if hit:
+            self.memo_hits += 1
+        else:
+            self.memo_misses += 1
+
+    def record_invalid_call(self, invalid_call, node=None):
+        """Record a tool call the model emitted in an invalid format"""
+        self.invalid_calls.append(invalid_call)
+        for sink in self.sinks:
+            sink.on_invalid_call(node, invalid_call)
+
+    def track_chunk(self, chunk):
+        """Record every tool call, invalid call and result in a streamed chunk.
+
+        Args:
+            chunk: A chunk from agent.stream() (node name -> state update)
+        """
+        for node, data in chunk.items():
+            if not data or 'messages' not in data:
+                continue
+            for message in data['messages']:
+                if isinstance(message, AIMessage):
+                    for tool_call in message.tool_calls:
+                        self.record_call(tool_call, node)
+                    if not message.tool_calls:
+                        for invalid_call in message.invalid_tool_calls:
+                            self.record_invalid_call(invalid_call, node)
+                elif isinstance(message, ToolMessage):
+                    self.record_result(message)
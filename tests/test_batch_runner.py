@@ -0,0 +1,13 @@
+import json
+from helpers.batch_runner import load_completed_ids
+
+def test_errored_queries_are_retried(tmp_path):
+    output = tmp_path / "results.jsonl"
+    records = [
+        {"id": "q1", "verdict": "correct", "passed": True},
+        {"id": "q2", "verdict": "error", "passed": False, "error": "ReadTimeout: timed out"},
+        {"id": "q3", "verdict": "error", "passed": False},
+        {"id": "q3", "verdict": "wrong", "passed": False},
+    ]
+    output.write_text("".join(json.dumps(record) + "\n" for record in records) + '{"id": "q4", "ver')
+    assert load_completed_ids(output) == {"q1", "q3"}
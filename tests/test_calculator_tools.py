@@ -0,0 +1,7 @@
+from helpers.calculator_tools import get_calculator_tools
+
+def test_rejected_expression_is_reported_to_the_model():
+    for memoize in (False, True):
+        evaluate_expression, = get_calculator_tools("expression", memoize=memoize)
+        assert evaluate_expression.invoke({"expression": "sqrt(16)"}).startswith("Cannot evaluate 'sqrt(16)'")
+        assert evaluate_expression.invoke({"expression": "(15 + 25) * 3"}) == 120
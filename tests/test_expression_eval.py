@@ -0,0 +1,17 @@
+import math
+from helpers import expression_eval
+from helpers.expression_eval import compile_expression, evaluate_bounded
+
+def test_non_finite_literals_are_evaluated():
+    assert compile_expression("1e400").max_bits == expression_eval.FLOAT_BITS
+    assert evaluate_bounded("1e400 + 1").value == math.inf
+    assert math.isnan(evaluate_bounded("1e400 - 1e400").value)
+
+def test_pool_follows_the_memory_limit():
+    try:
+        first = expression_eval._get_pool(512 * 1024 ** 2)
+        assert expression_eval._get_pool(512 * 1024 ** 2) is first
+        assert expression_eval._get_pool(256 * 1024 ** 2) is not first
+        assert evaluate_bounded("3 ** 50000 % 7", memory_limit=256 * 1024 ** 2).value == 2
+    finally:
+        expression_eval._reset_pool()
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from helpers.mock_llm_server import MockLLMServer
+from helpers.llm_cache import ResponseCache
+from helpers.llm_config import LLMClientRegistry
+from helpers.agent_utils import create_calculator_agent, run_calculation
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockLLMServer(port=0, ttft=0.05).start()
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.base_url)
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    yield server
+    server.stop()
+
+def test_repeats_sample_the_model_again(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr("helpers.llm_cache._response_cache", None)
+    agent = create_calculator_agent(use_cache=False)
+
+    run_calculation(agent, "Calculate 15 + 25", quiet=True)
+    requests = server.stats()["requests"]
+    result = run_calculation(agent, "Calculate 15 + 25", repeat=3, quiet=True)
+
+    # The first run is served from the cache, the two repeats go to the model
+    assert server.stats()["requests"] - requests == 2 * (len(result.runs) - 1)
+
+def test_concurrent_async_misses_keep_their_own_latency(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    client = LLMClientRegistry().get_client(server.base_url, "stand-in", "ollama", cache=cache)
+
+    async def ask_both():
+        await asyncio.gather(client.ainvoke("first"), client.ainvoke("second"))
+    asyncio.run(ask_both())
+
+    asyncio.run(ask_both())
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["saved_seconds"] >= 2 * 0.05
@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from langchain_core.messages import HumanMessage
+from helpers.mock_llm_server import MockLLMServer
+from helpers.llm_config import LLMClientRegistry, get_client_registry
+from helpers.agent_utils import create_calculator_agent
+
+QUERY = {"messages": [HumanMessage(content="Calculate 15 + 25")]}
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockLLMServer(port=0).start()
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.base_url)
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_CACHE_PATH", raising=False)
+    yield server
+    server.stop()
+
+def test_agent_survives_eviction(server, monkeypatch):
+    registry = get_client_registry()
+    monkeypatch.setattr(registry, "idle_timeout", 0.0)
+    agent = create_calculator_agent(use_cache=False)
+    assert agent.invoke(QUERY)["messages"][-1].content
+
+    assert registry.evict_idle() >= 1
+    assert agent.invoke(QUERY)["messages"][-1].content
+    assert asyncio.run(agent.ainvoke(QUERY))["messages"][-1].content
+
+def test_async_client_across_event_loops(server):
+    client = LLMClientRegistry().get_client(server.base_url, "stand-in", "ollama")
+    for _ in range(3):
+        assert asyncio.run(client.ainvoke("hi")).content
+
+def test_clients_are_shared(server):
+    registry = LLMClientRegistry()
+    first = registry.get_client(server.base_url, "stand-in", "ollama")
+    assert registry.get_client(server.base_url, "stand-in", "ollama") is first
+    assert registry.stats()["reused"] == 1
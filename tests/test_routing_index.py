@@ -0,0 +1,18 @@
+from helpers.routing_index import RoutingIndex
+
+INDEX = RoutingIndex({
+    "teacher": ["class", "debug", "code"],
+    "storyteller": ["tale", "story", "creative writing", "creative"],
+    "comedian": ["fun", "laugh", "joke"],
+})
+
+def test_inflections_match():
+    assert INDEX.matches("Two classes, coded and debugged") == {"class", "code", "debug"}
+    assert INDEX.matches("laughing at jokes and stories") == {"laugh", "joke", "story"}
+
+def test_longer_words_do_not_match():
+    assert not INDEX.matches("a classic and classical function")
+    assert not INDEX.matches("a talented writer with codenames")
+
+def test_multi_word_keyword_credits_contained_keywords():
+    assert INDEX.scores("help with creative writing") == {"teacher": 0, "storyteller": 2, "comedian": 0}
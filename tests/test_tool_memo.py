@@ -0,0 +1,20 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from helpers.calculator_tools import add
+from helpers.tool_memo import ToolMemoCache, memoize_tool
+from helpers.tool_tracker import ToolTracker, current_tracker
+
+def test_parallel_calls_are_all_counted():
+    tool = memoize_tool(add, cache=ToolMemoCache())
+    tracker = ToolTracker()
+    token = current_tracker.set(tracker)
+    try:
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: context.copy().run(tool.invoke, {"a": i % 10, "b": 1}),
+                                        range(2000)))
+    finally:
+        current_tracker.reset(token)
+    assert results[:3] == [1, 2, 3]
+    assert tracker.memo_hits + tracker.memo_misses == 2000
+    assert tracker.memo_misses >= 10